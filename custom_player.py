@@ -1,3 +1,183 @@
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+from evaluation_functions import CachedEvalFn
+from playouts import BoardBatch
+
+# Bound types of a transposition table entry: the stored score is the exact value of the position,
+# a lower bound on it (the search failed high) or an upper bound on it (the search failed low)
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when the player's time is about to run out. The partial result of the
+    interrupted search is thrown away and the best move of the last completed search is played."""
+
+    pass
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Board.hash_key().
+
+    Each slot holds one (key, depth, score, bound, best_move) entry and a new result simply replaces
+    whatever shares its slot, except that a shallower result never overwrites a deeper one for the
+    same position. The number of slots is derived from a memory budget, so the table never grows.
+    """
+
+    # Rough size in bytes of one stored entry (slot pointer, tuple, ints and the move)
+    ENTRY_BYTES = 200
+
+    def __init__(self, memory_mb=16):
+        """
+        Args:
+            memory_mb (float): Approximate memory budget for the table in megabytes
+        """
+        self.size = max(1, int(memory_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Return the (key, depth, score, bound, best_move) entry stored for key, or None."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, bound, best_move):
+        """Record the result of searching the position with hash key to the given depth."""
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] != key or depth >= entry[1]:
+            self.entries[index] = (key, depth, score, bound, best_move)
+
+    def clear(self):
+        """Drop every stored entry."""
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+
+class SharedTranspositionTable:
+    """TranspositionTable in shared memory, readable and writable by several processes at once.
+
+    Each slot is two 64-bit words: the key XORed with the data, and the data. The data packs the
+    score as a float32 (so exact for the integer scores of the evaluation functions, and for
+    infinity), the best move as a (row << 4 | col) byte per queen, the depth in 6 bits and the bound
+    in 2. Writers never lock: a slot torn by two processes writing it at once no longer XORs back
+    to its key, so it reads as a miss instead of a wrong entry. Boards up to 15x15 and depths up to
+    62 can be stored.
+
+    The table is pickled by the name of its memory block, so pool or helper processes started with
+    spawn attach to the same memory. The table that created the memory frees it with close(), or
+    when it is garbage collected, unless it is a copy inherited by a forked process.
+    """
+
+    ENTRY_BYTES = 16
+    WORD_MASK = (1 << 64) - 1
+    # Move byte of a missing best move; (15, 15) is off the largest supported board
+    NO_MOVE = 0xFF
+
+    def __init__(self, memory_mb=16):
+        """
+        Args:
+            memory_mb (float): Memory budget for the table in megabytes
+        """
+        self.size = max(1, int(memory_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.memory = shared_memory.SharedMemory(create=True, size=self.size * self.ENTRY_BYTES)
+        self.owner = os.getpid()
+        self.words = self.memory.buf.cast("Q")
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {"size": self.size, "name": self.memory.name}
+
+    def __setstate__(self, state):
+        self.size = state["size"]
+        self.owner = None
+        self.memory = shared_memory.SharedMemory(name=state["name"])
+        self.words = self.memory.buf.cast("Q")
+        self.hits = 0
+        self.misses = 0
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Detach from the shared memory, and free it if this process created the table."""
+        if self.words is None:
+            return
+        self.words.release()
+        self.words = None
+        self.memory.close()
+        if os.getpid() == self.owner:
+            self.memory.unlink()
+
+    @classmethod
+    def pack(cls, depth, score, bound, best_move):
+        """Pack an entry's depth (at least 1), score, bound and best move into a data word."""
+        move_bits = 0
+        for row, col in best_move or ((15, 15),) * 3:
+            move_bits = (move_bits << 8) | (row << 4 | col)
+        (score_bits,) = struct.unpack("<I", struct.pack("<f", score))
+        return (score_bits << 32) | (move_bits << 8) | (min(depth, 62) << 2) | bound
+
+    @classmethod
+    def unpack(cls, data):
+        """Unpack a data word into depth, score, bound and best move; depth 0 is an empty slot."""
+        (score,) = struct.unpack("<f", struct.pack("<I", data >> 32))
+        if score.is_integer():
+            score = int(score)
+        move_bits = (data >> 8) & 0xFFFFFF
+        best_move = None
+        if move_bits & 0xFF != cls.NO_MOVE:
+            best_move = tuple(
+                ((move_bits >> shift) >> 4 & 0xF, (move_bits >> shift) & 0xF)
+                for shift in (16, 8, 0)
+            )
+        return (data >> 2) & 0x3F, score, data & 0x3, best_move
+
+    def lookup(self, key):
+        """Return the (key, depth, score, bound, best_move) entry stored for key, or None."""
+        key &= self.WORD_MASK
+        index = 2 * (key % self.size)
+        check, data = self.words[index], self.words[index + 1]
+        if data and check ^ data == key:
+            depth, score, bound, best_move = self.unpack(data)
+            self.hits += 1
+            return key, depth, score, bound, best_move
+
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, bound, best_move):
+        """Record the result of searching the position with hash key to the given depth."""
+        key &= self.WORD_MASK
+        index = 2 * (key % self.size)
+        check, data = self.words[index], self.words[index + 1]
+        if data and check ^ data == key and depth < (data >> 2) & 0x3F:
+            return
+
+        data = self.pack(depth, score, bound, best_move)
+        self.words[index] = key ^ data
+        self.words[index + 1] = data
+
+    def clear(self):
+        """Drop every stored entry."""
+        self.memory.buf[:] = bytes(self.size * self.ENTRY_BYTES)
+        self.hits = 0
+        self.misses = 0
+
+
 # Algorithm for finding the best move
 def minimax(player, game, time_left, depth, my_turn=True, debug=False, output=None):
     """Implementation of the minimax algorithm.
@@ -38,11 +218,9 @@ def minimax(player, game, time_left, depth, my_turn=True, debug=False, output=No
         ai_player = game.get_inactive_player()
         cpu_player = game.get_active_player()
 
-    # Handle time running out
-    # TODO
-    if time_left() < 5:
-        # print(f"Move timing out. Selecting currently best found move")
-        return None, ai_player.utility(game, my_turn)
+    # Handle time running out. Unwind the whole search rather than passing a made-up value up the tree
+    if time_left() < player.time_margin:
+        raise SearchTimeout()
 
     ####################################################################################################
     # Search the game tree
@@ -54,35 +232,46 @@ def minimax(player, game, time_left, depth, my_turn=True, debug=False, output=No
         best_value = ai_player.utility(game, my_turn)
         return None, best_value
 
+    # Reuse the result of an earlier search of the same position to at least this depth. Only an
+    # exact score will do: the other searches store bounds in the same table
+    table = player.transposition_table
+    table_move, table_value = probe_table(player, game, depth, float("-inf"), float("inf"))
+    if table_value is not None:
+        return table_move, table_value
+
     if my_turn:
         # Initialize values
         max_value = float("-inf")
         best_move = None
 
-        # Get possible moves of the CustomPlayer
-        my_moves = game.get_active_moves()
+        # Get possible moves of the CustomPlayer. Opening placements are reduced by symmetry
+        my_moves = game.iter_opening_moves() if game.in_opening() else game.get_active_moves()
 
         for move in my_moves:
             player.count += 1
 
-            # Check all possible moves to see if a winner can be found
-            new_board_state, is_over, winner = game.forecast_move(move)
-
-            # Check to see if the game is ended while it is the AI's turn and after the next move
-            next_moves_possible = new_board_state.get_active_moves()
+            # Check all possible moves to see if a winner can be found. The move is made in place
+            # and taken back with pop_move, so no board is copied per searched node; it is taken
+            # back even when the search times out, so the caller's board is left as it was
+            is_over, winner = game.push_move(move)
+            try:
+                # The game is over once the opponent is left without any legal move
+                if is_over:
+                    return move, float("inf")
 
-            if is_over and len(next_moves_possible) == 0:
-                return move, float("inf")
-
-            else:
                 # Recursively search through the game tree
                 forecasted_move, forecasted_value = minimax(
-                    player, new_board_state, time_left, depth=depth - 1, my_turn=not my_turn
+                    player, game, time_left, depth=depth - 1, my_turn=not my_turn
                 )
+            finally:
+                game.pop_move()
 
-                if forecasted_value > max_value:
-                    max_value = forecasted_value
-                    best_move = move
+            if forecasted_value > max_value:
+                max_value = forecasted_value
+                best_move = move
+
+        if table is not None:
+            table.store(game.hash_key(), depth, max_value, EXACT, best_move)
 
         return best_move, max_value
 
@@ -91,52 +280,948 @@ def minimax(player, game, time_left, depth, my_turn=True, debug=False, output=No
         min_value = float("inf")
         best_move = None
 
-        # Get possible moves of the CustomPlayer
-        cpu_moves = game.get_active_moves()
+        # Get possible moves of the opponent. Opening placements are reduced by symmetry
+        cpu_moves = game.iter_opening_moves() if game.in_opening() else game.get_active_moves()
 
         for move in cpu_moves:
+            player.count += 1
 
             # Check all possible moves to see if a winner can be found
-            new_board_state, is_over, winner = game.forecast_move(move)
-
-            # Check to see if the game is ended while it is the opponents turn and after the next move
-            next_moves_possible = new_board_state.get_active_moves()
+            is_over, winner = game.push_move(move)
+            try:
+                # The game is over once the AI is left without any legal move
+                if is_over:
+                    return move, float("-inf")
 
-            if is_over and len(next_moves_possible) == 0:
-                return move, float("-inf")
-            else:
                 # Recursively search through the game tree
                 forecasted_move, forecasted_value = minimax(
-                    player, new_board_state, time_left, depth=depth - 1, my_turn=not my_turn
+                    player, game, time_left, depth=depth - 1, my_turn=not my_turn
                 )
+            finally:
+                game.pop_move()
+
+            if forecasted_value < min_value:
+                min_value = forecasted_value
+                best_move = move
 
-                if forecasted_value < min_value:
-                    min_value = forecasted_value
-                    best_move = move
+        if table is not None:
+            table.store(game.hash_key(), depth, min_value, EXACT, best_move)
 
         return best_move, min_value
 
 
+class MoveHistory:
+    """History and killer tables for ordering joint moves by their per-queen steps.
+
+    A joint move is three queen steps, and a step that refutes one move usually refutes its
+    siblings that share it. So rather than remembering whole joint moves, the tables score each
+    step of a queen from one cell to another, and a joint move is ordered by the sum of its steps'
+    scores. The history table adds depth * depth to every step of a move that caused a cutoff; the
+    killer table keeps, per ply and queen, the two latest steps that did. The tables live on the
+    player and carry over from one iterative deepening depth to the next.
+    """
+
+    # A killer step outranks any history score it is likely to be compared with
+    KILLER_BONUS = 1000000
+
+    def __init__(self):
+        # (queen_num, from cell) -> {to cell: score}
+        self.history = {}
+        # (ply, queen_num) -> up to two (from cell, to cell) steps, latest first
+        self.killers = {}
+
+    def step_scores(self, origins, ply):
+        """Scores of each queen's steps from its current cell in origins, at ply.
+
+        Returns:
+            list: Three dicts mapping a queen's destination cell to the score of stepping there
+        """
+        scores = []
+        for queen_num in range(3):
+            origin = origins[queen_num]
+            queen_scores = dict(self.history.get((queen_num, origin), ()))
+            for killer_origin, destination in self.killers.get((ply, queen_num), ()):
+                if killer_origin == origin:
+                    queen_scores[destination] = queen_scores.get(destination, 0) + self.KILLER_BONUS
+            scores.append(queen_scores)
+        return scores
+
+    def record_cutoff(self, origins, move, depth, ply):
+        """Credit the steps of a joint move that caused a cutoff at the given remaining depth and ply."""
+        for queen_num in range(3):
+            origin, destination = origins[queen_num], move[queen_num]
+            queen_scores = self.history.setdefault((queen_num, origin), {})
+            queen_scores[destination] = queen_scores.get(destination, 0) + depth * depth
+
+            killers = self.killers.get((ply, queen_num), ())
+            if (origin, destination) not in killers:
+                self.killers[(ply, queen_num)] = ((origin, destination),) + killers[:1]
+
+    def new_search(self):
+        """Start a new root search: killers refer to plies of the old root, old history counts half."""
+        self.killers = {}
+        for queen_scores in self.history.values():
+            for destination in queen_scores:
+                queen_scores[destination] //= 2
+
+
+def order_moves(
+    game, moves, first_move=None, history=None, ply=0, by_mobility=True, batch=False
+):
+    """Order the moves of the active player so the most promising are searched first.
+
+    By default moves are ranked by mobility: a move scores higher the more moves it leaves its
+    player and the fewer it leaves the opponent, which is cheap to find with
+    Board.count_active_moves/count_inactive_moves. Moves that end the game come first, and
+    first_move (e.g. the best move from the transposition table) before all. With a MoveHistory,
+    ties are broken by the killer and history scores of the moves' queen steps; with by_mobility
+    False, those scores alone rank the moves, without making any of them. With batch, the
+    mobility of all the moves is counted at once on a BoardBatch of their positions.
+
+    Args:
+        game (Board): A board and game state.
+        moves (list): Legal moves of the active player
+        first_move (tuple): Move to search before all others, if it is among moves
+        history (MoveHistory): History and killer tables of the search, if any
+        ply (int): Distance of this node from the root of the search
+        by_mobility (bool): Rank moves by mobility, not only by history
+        batch (bool): Count the mobility of all the moves in one vectorized pass
+
+    Returns:
+        list: moves, best first
+    """
+    q1_scores = q2_scores = q3_scores = {}
+    if history is not None:
+        q1_scores, q2_scores, q3_scores = history.step_scores(game.get_active_position(), ply)
+
+    if not by_mobility:
+        if not (q1_scores or q2_scores or q3_scores):
+            ordered = list(moves)
+        else:
+            ordered = sorted(
+                moves,
+                key=lambda move: (
+                    q1_scores.get(move[0], 0) + q2_scores.get(move[1], 0) + q3_scores.get(move[2], 0)
+                ),
+                reverse=True,
+            )
+        if first_move in moves:
+            ordered.remove(first_move)
+            ordered.insert(0, first_move)
+        return ordered
+
+    if batch and moves:
+        joint_moves = BoardBatch.children(game, moves).joint_moves()
+        mover_moves = joint_moves[:, game.__side__].tolist()
+        opponent_moves = joint_moves[:, game.__side__ ^ 1].tolist()
+
+    scores = {}
+    for index, move in enumerate(moves):
+        history_score = (
+            q1_scores.get(move[0], 0) + q2_scores.get(move[1], 0) + q3_scores.get(move[2], 0)
+        )
+        if batch:
+            is_over = opponent_moves[index] == 0
+            mobility = mover_moves[index] - opponent_moves[index]
+        else:
+            is_over, winner = game.push_move(move)
+            mobility = game.count_inactive_moves() - game.count_active_moves()
+            game.pop_move()
+
+        scores[move] = (float("inf"), 0) if is_over else (mobility, history_score)
+
+    if first_move in scores:
+        scores[first_move] = (float("inf"), float("inf"))
+
+    return sorted(moves, key=scores.__getitem__, reverse=True)
+
+
+def probe_table(player, game, depth, alpha, beta):
+    """Look the position up in the player's transposition table.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        depth: Depth the position is about to be searched to
+        alpha (float): Alpha value of the search window
+        beta (float): Beta value of the search window
+
+    Returns:
+        (tuple, float): The stored best move, to be searched first, and the stored value if it
+            decides the search of the (alpha, beta) window, or None if it has to be searched
+    """
+    table = player.transposition_table
+    if table is None:
+        return None, None
+    entry = table.lookup(game.hash_key())
+    if entry is None:
+        return None, None
+    if entry[1] >= depth and (
+        entry[3] == EXACT
+        or (entry[3] == LOWER_BOUND and entry[2] >= beta)
+        or (entry[3] == UPPER_BOUND and entry[2] <= alpha)
+    ):
+        return entry[4], entry[2]
+    return entry[4], None
+
+
+def store_result(player, game, depth, best_value, best_move, alpha, beta):
+    """Store the result of searching the position with the (alpha, beta) window.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        depth: Depth the position was searched to
+        best_value (float): Value the search returned
+        best_move (tuple): Move the search returned
+        alpha (float): Alpha value the search of the position started with
+        beta (float): Beta value the search of the position started with
+    """
+    table = player.transposition_table
+    if table is None:
+        return
+    if best_value <= alpha:
+        bound = UPPER_BOUND
+    elif best_value >= beta:
+        bound = LOWER_BOUND
+    else:
+        bound = EXACT
+    table.store(game.hash_key(), depth, best_value, bound, best_move)
+
+
+def alphabeta_moves(player, game, depth, first_move=None, ply=0):
+    """The active player's moves in the order alphabeta searches them.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        depth: Depth the position is about to be searched to
+        first_move (tuple): Move to search first, if it is legal
+        ply (int): Distance of this node from the root of the search
+
+    Returns:
+        list: Legal moves of the active player, most promising first
+    """
+    # Opening placements are reduced by symmetry; making moves to rank them only pays off above
+    # the leaves, next to which the history and killer tables alone order them
+    moves = list(game.iter_opening_moves()) if game.in_opening() else game.get_active_moves()
+    if depth > 1:
+        return order_moves(
+            game, moves, first_move, player.move_history, ply, batch=player.batch_eval
+        )
+    if player.move_history is not None:
+        return order_moves(game, moves, first_move, player.move_history, ply, by_mobility=False)
+    return moves
+
+
+def alphabeta(
+    player,
+    game,
+    time_left,
+    depth,
+    alpha=float("-inf"),
+    beta=float("inf"),
+    my_turn=True,
+    ply=0,
+    generate_moves=alphabeta_moves,
+    null_window=False,
+):
+    """Implementation of the alphabeta algorithm.
+
+    Args:
+        player (CustomPlayer): This is the instantiation of CustomPlayer()
+            that represents your agent. It is used to call anything you
+            need from the CustomPlayer class (the utility() method, for example,
+            or any class variables that belong to CustomPlayer())
+        game (Board): A board and game state.
+        time_left (function): Used to determine time left before timeout
+        depth: Used to track how deep you are in the search tree
+        alpha (float): Alpha value for pruning
+        beta (float): Beta value for pruning
+        my_turn (bool): True if you are computing scores during your turn.
+        ply (int): Distance of this node from the root of the search
+        generate_moves (function): Gives the moves of a node in the order to search them, called
+            as generate_moves(player, game, depth, first_move, ply); alphabeta_moves by default
+        null_window (bool): Test every move after the first with a null window first (see pvs)
+
+    Returns:
+        (tuple, int): best_move, val
+
+    # Note:
+        Returns the same value as minimax for the same depth, but stops searching a node's moves
+        as soon as one of them shows the opponent would never let the game reach it (alpha >= beta).
+        Moves are ordered with order_moves, the transposition table's best move first and then
+        by the player's MoveHistory, so that this happens as early as possible. Values outside
+        (alpha, beta) are only bounds, and are stored in the transposition table as such.
+        pvs and factored_alphabeta are this search with null_window and another generate_moves.
+    """
+
+    if my_turn:
+        ai_player = game.get_active_player()
+    else:
+        ai_player = game.get_inactive_player()
+
+    # Handle time running out. Unwind the whole search rather than passing a made-up value up the tree
+    if time_left() < player.time_margin:
+        raise SearchTimeout()
+
+    if depth == 0:
+        return None, ai_player.utility(game, my_turn)
+
+    # Reuse an earlier search of the same position if its result is decisive for this window
+    table_move, table_value = probe_table(player, game, depth, alpha, beta)
+    if table_value is not None:
+        return table_move, table_value
+
+    alpha_start, beta_start = alpha, beta
+
+    best_move = None
+    best_value = float("-inf") if my_turn else float("inf")
+
+    for index, move in enumerate(generate_moves(player, game, depth, table_move, ply)):
+        player.count += 1
+        if best_move is None:
+            best_move = move
+
+        # The move is taken back even when the search times out, leaving the board as it was
+        is_over, winner = game.push_move(move)
+        try:
+            # The game is over once the player to move next is left without any legal move
+            if is_over:
+                best_move, best_value = move, float("inf") if my_turn else float("-inf")
+                break
+
+            full_window = True
+            if null_window and index:
+                # Test whether the move beats the best so far; search it fully only if it does
+                if my_turn:
+                    null_alpha, null_beta = alpha, alpha + 1
+                else:
+                    null_alpha, null_beta = beta - 1, beta
+                forecasted_move, forecasted_value = alphabeta(
+                    player,
+                    game,
+                    time_left,
+                    depth - 1,
+                    null_alpha,
+                    null_beta,
+                    my_turn=not my_turn,
+                    ply=ply + 1,
+                    generate_moves=generate_moves,
+                    null_window=null_window,
+                )
+                full_window = alpha < forecasted_value < beta
+
+            if full_window:
+                forecasted_move, forecasted_value = alphabeta(
+                    player,
+                    game,
+                    time_left,
+                    depth - 1,
+                    alpha,
+                    beta,
+                    my_turn=not my_turn,
+                    ply=ply + 1,
+                    generate_moves=generate_moves,
+                    null_window=null_window,
+                )
+        finally:
+            game.pop_move()
+
+        if my_turn:
+            if forecasted_value > best_value:
+                best_move, best_value = move, forecasted_value
+            alpha = max(alpha, best_value)
+        else:
+            if forecasted_value < best_value:
+                best_move, best_value = move, forecasted_value
+            beta = min(beta, best_value)
+
+        if alpha >= beta:
+            if player.move_history is not None:
+                player.move_history.record_cutoff(game.get_active_position(), move, depth, ply)
+            break
+
+    store_result(player, game, depth, best_value, best_move, alpha_start, beta_start)
+
+    return best_move, best_value
+
+
+def pvs(
+    player, game, time_left, depth, alpha=float("-inf"), beta=float("inf"), my_turn=True, ply=0
+):
+    """Implementation of principal variation search (negascout) in the form of alphabeta.
+
+    Args:
+        player (CustomPlayer): This is the instantiation of CustomPlayer()
+            that represents your agent. It is used to call anything you
+            need from the CustomPlayer class (the utility() method, for example,
+            or any class variables that belong to CustomPlayer())
+        game (Board): A board and game state.
+        time_left (function): Used to determine time left before timeout
+        depth: Used to track how deep you are in the search tree
+        alpha (float): Alpha value for pruning
+        beta (float): Beta value for pruning
+        my_turn (bool): True if you are computing scores during your turn.
+        ply (int): Distance of this node from the root of the search
+
+    Returns:
+        (tuple, int): best_move, val
+
+    # Note:
+        Returns the same value as alphabeta for the same depth. With good move ordering the first
+        move is usually the best, so only it is searched with the full (alpha, beta) window. Every
+        other move is searched with a null window just above alpha (below beta at the opponent's
+        turn), which only tells whether it is better than the best so far and prunes far more.
+        The few moves that turn out better are searched again with the full window. The null
+        window is 1 wide, which assumes integer scores as given by the functions in
+        evaluation_functions.py.
+    """
+
+    return alphabeta(
+        player, game, time_left, depth, alpha, beta, my_turn=my_turn, ply=ply, null_window=True
+    )
+
+
+def iter_factored_moves(game, first_move=None, history=None, ply=0):
+    """Lazily yield the active player's joint moves as three nested per-queen decisions.
+
+    Queen 1's step is chosen first, then queen 2's among the cells queen 1 left free, then
+    queen 3's. Each queen's steps are tried in the order of the MoveHistory step scores, so
+    the completions of the most promising first steps come first, and a search that stops at
+    a cutoff never builds the completions of the remaining ones. first_move is yielded first.
+
+    Args:
+        game (Board): A board and game state.
+        first_move (tuple): Move to yield before all others, if it is legal
+        history (MoveHistory): History and killer tables of the search, if any
+        ply (int): Distance of this node from the root of the search
+
+    Returns:
+        generator of ((int, int),(int, int), (int,int)): Legal joint moves
+    """
+    queen_moves = [
+        game.get_legal_moves_of_queen1(),
+        game.get_legal_moves_of_queen2(),
+        game.get_legal_moves_of_queen3(),
+    ]
+    if history is not None:
+        step_scores = history.step_scores(game.get_active_position(), ply)
+        for moves, scores in zip(queen_moves, step_scores):
+            if scores:
+                moves.sort(key=lambda cell: scores.get(cell, 0), reverse=True)
+
+    if first_move is not None and (
+        len(set(first_move)) == 3
+        and all(step in moves for step, moves in zip(first_move, queen_moves))
+    ):
+        yield first_move
+    else:
+        first_move = None
+
+    for move1 in queen_moves[0]:
+        for move2 in queen_moves[1]:
+            if move2 == move1:
+                continue
+            for move3 in queen_moves[2]:
+                if move3 != move1 and move3 != move2 and (move1, move2, move3) != first_move:
+                    yield move1, move2, move3
+
+
+def factored_moves(player, game, depth, first_move=None, ply=0):
+    """The active player's moves in the order factored_alphabeta searches them.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        depth: Depth the position is about to be searched to
+        first_move (tuple): Move to search first, if it is legal
+        ply (int): Distance of this node from the root of the search
+
+    Returns:
+        list or generator: Legal moves of the active player, most promising first. Past the
+            opening they are generated lazily by iter_factored_moves
+    """
+    # Placements are not queen steps; they are reduced by symmetry and ranked as in alphabeta
+    if game.in_opening():
+        moves = list(game.iter_opening_moves())
+        if depth > 1:
+            moves = order_moves(
+                game, moves, first_move, player.move_history, ply, batch=player.batch_eval
+            )
+        return moves
+    return iter_factored_moves(game, first_move, player.move_history, ply)
+
+
+def factored_alphabeta(
+    player, game, time_left, depth, alpha=float("-inf"), beta=float("inf"), my_turn=True, ply=0
+):
+    """Implementation of alphabeta over joint moves split into per-queen decisions.
+
+    Args:
+        player (CustomPlayer): This is the instantiation of CustomPlayer()
+            that represents your agent. It is used to call anything you
+            need from the CustomPlayer class (the utility() method, for example,
+            or any class variables that belong to CustomPlayer())
+        game (Board): A board and game state.
+        time_left (function): Used to determine time left before timeout
+        depth: Used to track how deep you are in the search tree
+        alpha (float): Alpha value for pruning
+        beta (float): Beta value for pruning
+        my_turn (bool): True if you are computing scores during your turn.
+        ply (int): Distance of this node from the root of the search
+
+    Returns:
+        (tuple, int): best_move, val
+
+    # Note:
+        Returns the same value as alphabeta for the same depth. A ply is searched as queen 1's
+        step, then queen 2's, then queen 3's (see iter_factored_moves). All three decisions
+        belong to the same player, so the value of a partial move is the best of its
+        completions and is only known once they are searched: no bound can prune a first step
+        before its completions are tried, and the branching factor stays that of joint moves.
+        What the factoring saves is the work of building and ranking every joint move up front,
+        since a cutoff stops the generation wherever it happens.
+    """
+
+    return alphabeta(
+        player,
+        game,
+        time_left,
+        depth,
+        alpha,
+        beta,
+        my_turn=my_turn,
+        ply=ply,
+        generate_moves=factored_moves,
+    )
+
+
+def aspiration_search(player, game, time_left, depth, search, guess, window):
+    """Search to depth with a window around guess, widening it until the score falls inside.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        time_left (function): Used to determine time left before timeout
+        depth (int): Depth to search to
+        search (function): Search taking alpha and beta, e.g. alphabeta or pvs
+        guess (float): Expected score, usually that of the previous depth
+        window (float): Half width of the first window
+
+    Returns:
+        (tuple, int): best_move, val
+    """
+    alpha, beta = guess - window, guess + window
+    while True:
+        best_move, best_value = search(player, game, time_left, depth=depth, alpha=alpha, beta=beta)
+        if best_value <= alpha and alpha != float("-inf"):
+            alpha = float("-inf")
+        elif best_value >= beta and beta != float("inf"):
+            beta = float("inf")
+        else:
+            return best_move, best_value
+
+
+def iterative_deepening(
+    player, game, time_left, max_depth=None, search=alphabeta, aspiration_window=None
+):
+    """Search to depth 1, 2, 3, ... until the time runs out or max_depth is reached.
+
+    The best move of the last completed depth is always kept, so a move is ready whenever the
+    search has to stop. A new depth is only started when it is expected to finish: each depth
+    is assumed to take at most player.depth_growth times as long as the previous one. Earlier
+    depths fill the transposition table, whose best moves make the next depth's pruning better.
+
+    With an aspiration window, each depth is first searched with the window of that width around
+    the previous depth's score, which prunes more when the score changes little. If the score
+    falls outside, the failing side of the window is opened and the depth searched again.
+
+    Args:
+        player (CustomPlayer): The agent searching
+        game (Board): A board and game state.
+        time_left (function): Used to determine time left before timeout
+        max_depth (int): Deepest search to run, None to search as deep as time allows
+        search (function): Search called for each depth, e.g. alphabeta, pvs or minimax
+        aspiration_window (float): Half width of the window around the previous score, None to
+            search every depth with a full window. Needs a search with alpha and beta arguments
+
+    Returns:
+        (tuple, int, int): best_move, val, depth of the last completed search (0 if none completed)
+    """
+    # Any legal move is better than none if not even depth 1 completes
+    moves = game.iter_opening_moves() if game.in_opening() else game.iter_active_moves()
+    best_move, best_value, completed_depth = next(moves, None), None, 0
+
+    # A search can never be deeper than the number of turns the open cells allow
+    depth_limit = game.width * game.height
+    if max_depth is not None:
+        depth_limit = min(depth_limit, max_depth)
+
+    for depth in range(1, depth_limit + 1):
+        started = time_left()
+        try:
+            if aspiration_window is None or best_value is None or abs(best_value) == float("inf"):
+                move, best_value = search(player, game, time_left, depth=depth)
+            else:
+                move, best_value = aspiration_search(
+                    player, game, time_left, depth, search, best_value, aspiration_window
+                )
+        except SearchTimeout:
+            break
+        completed_depth = depth
+
+        # minimax finds no best move when every move loses; keep playing a legal one
+        if move is not None:
+            best_move = move
+
+        # A won or lost game does not change with more depth
+        if best_value in (float("inf"), float("-inf")):
+            break
+
+        spent = started - time_left()
+        if spent * player.depth_growth > time_left() - player.time_margin:
+            break
+
+    return best_move, best_value, completed_depth
+
+
+def solve_partitioned(player, game, time_left):
+    """Exact result of a position where the two players' queens can no longer interact.
+
+    Once game.is_partitioned(), each player can only keep its own queens moving for as long as its
+    part of the board allows, so the player to move wins if and only if it lasts longer than the
+    opponent (see Board.longest_survival). The opponent's survival is found first, so the active
+    player's search can stop as soon as it outlasts it.
+
+    Args:
+        player (CustomPlayer): The agent searching, the active player
+        game (Board): A partitioned board and game state.
+        time_left (function): Used to determine time left before timeout
+
+    Returns:
+        (tuple, int): best_move (one that keeps the active player moving longest), val (inf if
+            the active player wins, -inf if it loses)
+    """
+
+    def check():
+        if time_left() < player.time_margin:
+            raise SearchTimeout()
+
+    opponent_survival, _ = game.longest_survival(game.get_inactive_player(), check=check)
+    survival, best_move = game.longest_survival(limit=opponent_survival + 1, check=check)
+    return best_move, float("inf") if survival > opponent_survival else float("-inf")
+
+
+def _lazy_smp_helper(player, game, deadline, index):
+    """Helper process of a Lazy SMP search (see CustomPlayer.lazy_smp_move).
+
+    Runs the player's own iterative deepening on the root position until the deadline. Only its
+    entries in the shared transposition table matter, so its results are dropped. Odd helpers
+    search one depth ahead, so the others find deeper results in the table.
+
+    Args:
+        player (CustomPlayer): Copy of the searching player, sharing its transposition table
+        game (Board): The root position
+        deadline (float): time.time() at which to stop
+        index (int): Number of the helper, from 1
+    """
+
+    def time_left():
+        return (deadline - time.time()) * 1000
+
+    depth_limit = game.width * game.height
+    if player.search_depth is not None:
+        depth_limit = min(depth_limit, player.search_depth)
+
+    for depth in range(1 + index % 2, depth_limit + 1):
+        try:
+            player.search(player, game, time_left, depth=depth)
+        except SearchTimeout:
+            return
+
+
+def _ponder(player, game, deadline):
+    """Pondering process (see CustomPlayer.start_pondering).
+
+    Searches the position reached by each reply of the opponent, deeper and deeper, until the
+    deadline or until the process is stopped. Each is searched from the player's side with a full
+    window, as move() will search it, so that its result is exact and can be taken straight from
+    the shared transposition table. Replies are searched the opponent's best first, as found by
+    the previous depth, so the likeliest ones are always the deepest searched.
+
+    Args:
+        player (CustomPlayer): Copy of the player, sharing its transposition table
+        game (Board): Position after the player's move
+        deadline (float): time.time() at which to stop
+    """
+
+    def time_left():
+        return (deadline - time.time()) * 1000
+
+    replies = list(game.iter_opening_moves()) if game.in_opening() else game.get_active_moves()
+    replies = order_moves(game, replies)
+    values = {}
+    for depth in range(1, game.width * game.height):
+        for reply in replies:
+            is_over, winner = game.push_move(reply)
+            if not is_over:
+                try:
+                    best_move, values[reply] = player.search(player, game, time_left, depth)
+                except SearchTimeout:
+                    return
+            game.pop_move()
+
+        # The replies that are worst for the player are the ones the opponent is likeliest to play
+        replies.sort(key=lambda reply: values.get(reply, float("-inf")))
+        if all(abs(value) == float("inf") for value in values.values()):
+            return
+
+
+# State of a parallel root search in each pool process, set up by _init_root_worker
+_root_worker = {}
+
+
+def _init_root_worker(player, game, shared_alpha, deadline):
+    """Pool initializer: keep the searching player, the root position, the alpha bound shared by
+    all workers and the wall clock deadline of the move for the tasks run by this process."""
+    _root_worker.update(player=player, game=game, shared_alpha=shared_alpha, deadline=deadline)
+
+
+def _root_worker_time_left():
+    """Milliseconds left before the deadline of the move, the time_left of searches in a worker."""
+    return (_root_worker["deadline"] - time.time()) * 1000
+
+
+def _search_root_move(index, move, depth, beta):
+    """Pool task: search one root move to depth with the worker's player.
+
+    The move is searched with the alpha bound shared by the workers, lowered by 1 so that a move
+    scoring as much as the best found so far still gets its exact score.
+
+    Returns:
+        (int, float, bool, int): index, score, whether the score is exact rather than a bound
+            (None if the search timed out), number of game states searched
+    """
+    player = _root_worker["player"]
+    shared_alpha = _root_worker["shared_alpha"]
+    player.count = 0
+
+    game = _root_worker["game"]
+    with shared_alpha.get_lock():
+        alpha = shared_alpha.value - 1
+    game.push_move(move)
+    try:
+        _, value = player.search(
+            player, game, _root_worker_time_left, depth - 1, alpha, beta, my_turn=False, ply=1
+        )
+    except SearchTimeout:
+        return index, None, False, player.count
+    finally:
+        game.pop_move()
+
+    # A score of beta or more only bounds the move from below; sharing it as alpha would leave
+    # the other workers searching an empty window
+    exact = alpha < value < beta
+    if exact:
+        with shared_alpha.get_lock():
+            shared_alpha.value = max(shared_alpha.value, value)
+    return index, value, exact, player.count
+
+
+class ParallelRootSearch:
+    """Search whose root moves are split across a pool of processes.
+
+    Made for one move of a player: the pool processes start with a copy of the player and of the
+    position, and reuse their transposition tables and move histories across the depths of
+    iterative deepening. An instance is called like alphabeta, but only for the root:
+
+        with ParallelRootSearch(player, game, workers=8, deadline=deadline) as search:
+            best_move, best_value, depth = iterative_deepening(player, game, time_left, search=search)
+
+    Root moves are ordered by order_moves with the previous depth's best move first. That move is
+    searched on its own, to get a good alpha bound, then the rest in parallel. Workers share the
+    best score found in shared memory and search each move with it as alpha, less 1 (scores are
+    integers), so every move as good as the best gets its exact score whatever the timing. The best
+    move is then the first in root order with the best score, the same on every run.
+    """
+
+    def __init__(self, player, game, workers, deadline):
+        """
+        Args:
+            player (CustomPlayer): The agent searching; its search function is run by the workers
+            game (Board): The position to search
+            workers (int): Number of processes
+            deadline (float): time.time() at which every worker stops searching
+        """
+        self.workers = workers
+        self.best_move = None
+        self.shared_alpha = multiprocessing.Value("d", float("-inf"))
+        self.pool = multiprocessing.Pool(
+            workers, _init_root_worker, (player, game, self.shared_alpha, deadline)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes."""
+        self.pool.terminate()
+        self.pool.join()
+
+    def __call__(
+        self, player, game, time_left, depth, alpha=float("-inf"), beta=float("inf"), my_turn=True
+    ):
+        """Search the root position to depth across the pool.
+
+        Args:
+            player (CustomPlayer): The agent searching
+            game (Board): The root position, the one the pool was started with
+            time_left (function): Used to determine time left before timeout
+            depth (int): Depth to search to
+            alpha (float): Alpha value for pruning
+            beta (float): Beta value for pruning
+            my_turn (bool): Must be True, the workers search the opponent's replies
+
+        Returns:
+            (tuple, int): best_move, val
+        """
+        if time_left() < player.time_margin:
+            raise SearchTimeout()
+
+        moves = list(game.iter_opening_moves()) if game.in_opening() else game.get_active_moves()
+        moves = order_moves(game, moves, self.best_move)
+        if not moves:
+            return None, float("-inf")
+        player.count += len(moves)
+
+        for move in moves:
+            is_over, winner = game.push_move(move)
+            game.pop_move()
+            if is_over:
+                self.best_move = move
+                return move, float("inf")
+
+        # Leaves are not worth a round trip to the pool; score them here as alphabeta would
+        if depth == 1:
+            best_move, best_value = moves[0], float("-inf")
+            for move in moves:
+                game.push_move(move)
+                value = player.utility(game, False)
+                game.pop_move()
+                if value > best_value:
+                    best_move, best_value = move, value
+                if best_value >= beta:
+                    break
+            self.best_move = best_move
+            return best_move, best_value
+
+        self.shared_alpha.value = alpha + 1
+        tasks = [(index, move, depth, beta) for index, move in enumerate(moves)]
+        results = [self.pool.apply(_search_root_move, tasks[0])]
+        results += self.pool.starmap(_search_root_move, tasks[1:], chunksize=1)
+
+        best_index, best_value = None, float("-inf")
+        for index, value, exact, count in results:
+            player.count += count
+            if value is None:
+                raise SearchTimeout()
+            if (exact or value >= beta) and (best_index is None or value > best_value):
+                best_index, best_value = index, value
+        if best_index is None:
+            # Every move failed low: none is better than alpha, take the one with the highest bound
+            for index, value, exact, count in results:
+                if best_index is None or value > best_value:
+                    best_index, best_value = index, value
+
+        self.best_move = moves[best_index]
+        return self.best_move, best_value
+
+
 class CustomPlayer:
     """Player that chooses a move using your evaluation function
     and a minimax algorithm with alpha-beta pruning.
     You must finish and test this player to make sure it properly
     uses minimax and alpha-beta to return a good move."""
 
-    def __init__(self, eval_fn=None, search_depth=3, output=None):
+    def __init__(
+        self,
+        eval_fn=None,
+        search_depth=None,
+        output=None,
+        tt_memory_mb=16,
+        time_margin=50,
+        depth_growth=4,
+        move_history=True,
+        search=alphabeta,
+        aspiration_window=None,
+        workers=None,
+        parallel="root",
+        endgame_solver=True,
+        ponder=False,
+        ponder_limit=30000,
+        batch_eval=True,
+        eval_cache_size=0,
+    ):
         """Initializes your player.
 
         if you find yourself with a superior eval function, update the default
         value of `eval_fn` to `CustomEvalFn()`
 
         Args:
-            search_depth (int): The depth to which your agent will search
+            search_depth (int): The deepest your agent will search, None to search as deep
+                as the time limit allows
             eval_fn (function): Evaluation function used by your agent
+            tt_memory_mb (float): Memory budget of the transposition table in megabytes,
+                0 to search without one
+            time_margin (float): Milliseconds of time_left at which a search is abandoned
+            depth_growth (float): Expected ratio between the time of one search depth and the
+                previous one, used to decide whether another depth can finish in time
+            move_history (bool): Order moves with history and killer tables of queen steps
+            search (function): Search run at each depth, alphabeta, pvs or factored_alphabeta
+            aspiration_window (float): Half width of the window around the previous depth's score
+                each depth is first searched with, None to always search with a full window
+            workers (int): Number of processes to search with, None to search in this process only
+            parallel (str): How workers share a search: "root" splits the root moves across them
+                (see ParallelRootSearch), "lazy_smp" has them all search the root and share a
+                transposition table in shared memory (see lazy_smp_move)
+            endgame_solver (bool): Solve positions where the players' queens are partitioned
+                exactly (see solve_partitioned) instead of searching them
+            ponder (bool): Keep searching in a background process while the opponent thinks
+                (see start_pondering)
+            ponder_limit (float): Milliseconds after which pondering stops if no move is asked for
+            batch_eval (bool): Count the mobility of all the moves of a node at once with NumPy
+                to order them (see order_moves)
+            eval_cache_size (int): Number of leaf scores to remember between searches (see
+                evaluation_functions.CachedEvalFn), 0 to score every leaf anew
         """
+        if eval_cache_size:
+            eval_fn = CachedEvalFn(eval_fn, eval_cache_size)
         self.eval_fn = eval_fn
         self.search_depth = search_depth
         self.output = output
         self.count = 0
+        self.transposition_table = None
+        if tt_memory_mb and (ponder or (workers and parallel == "lazy_smp")):
+            self.transposition_table = SharedTranspositionTable(tt_memory_mb)
+        elif tt_memory_mb:
+            self.transposition_table = TranspositionTable(tt_memory_mb)
+        self.time_margin = time_margin
+        self.depth_growth = depth_growth
+        self.depth_reached = 0
+        self.move_history = MoveHistory() if move_history else None
+        self.search = search
+        self.aspiration_window = aspiration_window
+        self.workers = workers
+        self.parallel = parallel
+        self.endgame_solver = endgame_solver
+        self.ponder = ponder
+        self.ponder_limit = ponder_limit
+        self.ponder_process = None
+        self.batch_eval = batch_eval
 
     def move(self, game, time_left):
         """Called to determine one move by your agent
@@ -144,7 +1229,10 @@ class CustomPlayer:
         Note:
             1. Do NOT change the name of this 'move' function. We are going to call
             this function directly.
-            2. Call alphabeta instead of minimax once implemented.
+            2. The move is searched with self.search (alphabeta unless another was chosen),
+            deepened one depth at a time for as long as time_left allows (see
+            iterative_deepening). Once the queens are partitioned the game is solved
+            exactly instead (see solve_partitioned).
         Args:
             game (Board): The board and game state.
             time_left (function): Used to determine time left before timeout
@@ -152,23 +1240,185 @@ class CustomPlayer:
         Returns:
             tuple: ((int,int),(int,int),(int,int)): Your best move
         """
-        with self.output:
-            self.output.append_stdout("Calculating best move...\n")
+        self.report("Calculating best move...\n")
         # print("Calculating best move...")
-        best_move, utility = minimax(self, game, time_left, depth=self.search_depth)
+        self.stop_pondering()
 
-        with self.output:
-            self.output.append_stdout(f"AI Player: Moving {best_move} with value {utility} \n")
-            self.output.append_stdout(
-                f"AI Player searched through {self.count} game states to find it's next move \n"
+        # Pondering goes on from the position as it was given, whatever the search does with it
+        position = game.copy() if self.ponder else None
+        if self.move_history is not None:
+            self.move_history.new_search()
+        solved = self.endgame_solver and game.is_partitioned() and self.solve(game, time_left)
+        if solved:
+            best_move, utility = solved
+            self.depth_reached = 0
+        elif self.workers and self.parallel == "lazy_smp":
+            best_move, utility, self.depth_reached = self.lazy_smp_move(game, time_left)
+        elif self.workers:
+            best_move, utility, self.depth_reached = self.parallel_move(game, time_left)
+        else:
+            best_move, utility, self.depth_reached = iterative_deepening(
+                self,
+                game,
+                time_left,
+                max_depth=self.search_depth,
+                search=self.search,
+                aspiration_window=self.aspiration_window,
             )
 
+        self.report(f"AI Player: Moving {best_move} with value {utility} \n")
+        self.report(
+            f"AI Player searched through {self.count} game states to depth {self.depth_reached} "
+            f"to find it's next move \n"
+        )
+        if isinstance(self.eval_fn, CachedEvalFn):
+            self.report(f"AI Player found {self.eval_fn.hit_rate():.0%} of leaf scores cached \n")
+
         # print(f"AI Player: Moving {best_move} with value {utility}")
         # print(f"AI Player searched through {self.count} game states to find it's next move")
         # print("---------------------------")
         self.count = 0
+        if self.ponder:
+            self.start_pondering(position, best_move)
         return best_move
 
+    def start_pondering(self, game, best_move):
+        """Search the opponent's replies to best_move in a background process until the next move.
+
+        The search runs in a separate process, so it neither uses up the time_left of this process
+        nor slows down an opponent timed in it, and it shares the transposition table, which
+        is then full of results for the position whatever the reply. The next call to move()
+        stops it and finds them when it searches. Pondering needs a transposition table.
+
+        Args:
+            game (Board): The board and game state the move was chosen in, as it was before the
+                search
+            best_move (tuple): The move chosen
+        """
+        if self.transposition_table is None or best_move is None:
+            return
+        next_game, is_over, winner = game.forecast_move(best_move)
+        if is_over:
+            return
+
+        deadline = time.time() + self.ponder_limit / 1000
+        self.ponder_process = multiprocessing.Process(
+            target=_ponder, args=(self, next_game, deadline), daemon=True
+        )
+        self.ponder_process.start()
+
+    def stop_pondering(self):
+        """Stop the pondering process, if one is running."""
+        if self.ponder_process is not None:
+            self.ponder_process.terminate()
+            self.ponder_process.join()
+            self.ponder_process = None
+
+    def solve(self, game, time_left):
+        """Solve a partitioned position with solve_partitioned, within half of the time left.
+
+        Args:
+            game (Board): A partitioned board and game state.
+            time_left (function): Used to determine time left before timeout
+
+        Returns:
+            (tuple, int): best_move, val, or None if it could not be solved in time, leaving the
+                rest of the time to search the position instead
+        """
+        solver_margin = max(self.time_margin, time_left() / 2)
+
+        def solver_time_left():
+            return time_left() - solver_margin + self.time_margin
+
+        try:
+            best_move, utility = solve_partitioned(self, game, solver_time_left)
+        except SearchTimeout:
+            return None
+
+        self.report("AI Player: Queens are partitioned, solved the game exactly \n")
+        return best_move, utility
+
+    def parallel_move(self, game, time_left):
+        """Run iterative deepening with the root moves split across self.workers processes.
+
+        time_left measures the time of this process only, which hardly runs while the workers
+        search, so it is turned into a wall clock deadline that all of them share.
+
+        Args:
+            game (Board): The board and game state.
+            time_left (function): Used to determine time left before timeout
+
+        Returns:
+            (tuple, int, int): best_move, val, depth of the last completed search
+        """
+        deadline = time.time() + time_left() / 1000
+
+        def wall_time_left():
+            return (deadline - time.time()) * 1000
+
+        with ParallelRootSearch(self, game, self.workers, deadline) as search:
+            return iterative_deepening(
+                self,
+                game,
+                wall_time_left,
+                max_depth=self.search_depth,
+                search=search,
+                aspiration_window=self.aspiration_window,
+            )
+
+    def lazy_smp_move(self, game, time_left):
+        """Run iterative deepening here while self.workers - 1 helper processes search the same root.
+
+        All of them share the transposition table, so the helpers' results, some a depth ahead,
+        cut the searches of this process short. Unlike ParallelRootSearch this uses every worker
+        even when there are only a few root moves, as often near the end of a game. This process
+        decides the move and the timing as usual; the helpers are stopped when it is done.
+
+        Args:
+            game (Board): The board and game state.
+            time_left (function): Used to determine time left before timeout
+
+        Returns:
+            (tuple, int, int): best_move, val, depth of the last completed search
+        """
+        deadline = time.time() + time_left() / 1000
+        helpers = [
+            multiprocessing.Process(
+                target=_lazy_smp_helper, args=(self, game, deadline, index), daemon=True
+            )
+            for index in range(1, self.workers)
+        ]
+        for helper in helpers:
+            helper.start()
+
+        try:
+            return iterative_deepening(
+                self,
+                game,
+                time_left,
+                max_depth=self.search_depth,
+                search=self.search,
+                aspiration_window=self.aspiration_window,
+            )
+        finally:
+            for helper in helpers:
+                helper.terminate()
+                helper.join()
+
+    def __getstate__(self):
+        """Pickle without the notebook output widget or pondering process, e.g. to start pool
+        processes."""
+        state = self.__dict__.copy()
+        state["output"] = None
+        state["ponder_process"] = None
+        return state
+
+    def report(self, message):
+        """Write a progress message to the notebook output widget, if the player has one."""
+        if self.output is not None:
+            with self.output:
+                self.output.append_stdout(message)
+
     def utility(self, game, my_turn):
         """You can handle special cases here (e.g. endgame)"""
         return self.eval_fn.score(game, self)
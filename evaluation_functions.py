@@ -1,5 +1,35 @@
 # Heuristic for evluation of the board state
-from custom_player import CustomPlayer
+from collections import OrderedDict
+
+import numpy as np
+
+from playouts import BoardBatch
+
+
+def mobility_batch(boards, my_player=None):
+    """Number of moves of my_player and of its opponent in many boards, in one vectorized pass.
+
+    The counts are the ones Board.mobility_pair gives the evaluators' score() methods, but
+    computed for all the boards at once with NumPy rather than one board at a time. It pays off
+    from a handful of boards, such as the children of a node of a search.
+
+    Args:
+        boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+        my_player (Player object): This specifies which player you are.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): int, moves of my_player and moves of its opponent
+    """
+    boards = BoardBatch.of(boards)
+    moves = boards.joint_moves()
+
+    my_side = boards.side_of(my_player)
+    return moves[:, my_side], moves[:, my_side ^ 1]
+
+
+def game_ratio_batch(boards):
+    """Fraction of the board filled by the moves made so far, in each position of a BoardBatch."""
+    return boards.move_count / (boards.width * boards.height)
 
 
 class OpenMoveEvalFn:
@@ -21,18 +51,24 @@ class OpenMoveEvalFn:
 
             """
         # Simple crude heuristic which favours the number of possible moves our AI has in comparison
-        # to the other player. CustomPlayer is always trying to maximize this value
-        # and RandomPlayer is trying to minimimize
-        if isinstance(my_player, CustomPlayer):
+        # to the other player. my_player is always trying to maximize this value
+        # and its opponent is trying to minimimize
+        num_active_moves_my_player, num_active_moves_opponent = game.mobility_pair(my_player)
 
-            num_active_moves_my_player = game.get_player_moves(my_player=my_player)
-            num_active_moves_opponent = game.get_opponent_moves(my_player=my_player)
+        return num_active_moves_my_player - num_active_moves_opponent
 
-        else:
-            num_active_moves_my_player = game.get_opponent_moves(my_player=my_player)
-            num_active_moves_opponent = game.get_player_moves(my_player=my_player)
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
 
-        return len(num_active_moves_my_player) - len(num_active_moves_opponent)
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        return my_moves - opp_moves
 
 
 class DefensiveEvalFn:
@@ -56,15 +92,22 @@ class DefensiveEvalFn:
             float: The current state's score, based on your own heuristic.
         """
 
-        if isinstance(my_player, CustomPlayer):
-            my_moves = game.get_player_moves(my_player=my_player)
-            opp_moves = game.get_opponent_moves(my_player=my_player)
+        my_moves, opp_moves = game.mobility_pair(my_player)
 
-        else:
-            my_moves = game.get_opponent_moves(my_player=my_player)
-            opp_moves = game.get_player_moves(my_player=my_player)
+        return (my_moves * 2) - opp_moves
 
-        return (len(my_moves) * 2) - len(opp_moves)
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
+
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        return (my_moves * 2) - opp_moves
 
 
 class OffensiveEvalFn:
@@ -89,15 +132,22 @@ class OffensiveEvalFn:
             float: The current state's score, based on your own heuristic.
         """
 
-        if isinstance(my_player, CustomPlayer):
-            my_moves = game.get_player_moves(my_player=my_player)
-            opp_moves = game.get_opponent_moves(my_player=my_player)
+        my_moves, opp_moves = game.mobility_pair(my_player)
 
-        else:
-            my_moves = game.get_opponent_moves(my_player=my_player)
-            opp_moves = game.get_player_moves(my_player=my_player)
+        return my_moves - (opp_moves * 2)
 
-        return len(my_moves) - (len(opp_moves) * 2)
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
+
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        return my_moves - (opp_moves * 2)
 
 
 class DefenseToOffenseEvalFn:
@@ -125,21 +175,30 @@ class DefenseToOffenseEvalFn:
             float: The current state's score, based on your own heuristic.
         """
 
-        if isinstance(my_player, CustomPlayer):
-            my_moves = game.get_player_moves(my_player=my_player)
-            opp_moves = game.get_opponent_moves(my_player=my_player)
-
-        else:
-            my_moves = game.get_opponent_moves(my_player=my_player)
-            opp_moves = game.get_player_moves(my_player=my_player)
+        my_moves, opp_moves = game.mobility_pair(my_player)
 
         board_size = game.width * game.height
         ratio = game.move_count / board_size
 
         if ratio <= 0.5:
-            return (len(my_moves) * 2) - len(opp_moves)
+            return (my_moves * 2) - opp_moves
         else:
-            return len(my_moves) - (len(opp_moves) * 2)
+            return my_moves - (opp_moves * 2)
+
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
+
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        boards = BoardBatch.of(boards)
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        ratio = game_ratio_batch(boards)
+        return np.where(ratio <= 0.5, (my_moves * 2) - opp_moves, my_moves - (opp_moves * 2))
 
 
 class OffenseToDefenseEvalFn:
@@ -167,18 +226,154 @@ class OffenseToDefenseEvalFn:
             float: The current state's score, based on your own heuristic.
         """
 
-        if isinstance(my_player, CustomPlayer):
-            my_moves = game.get_player_moves(my_player=my_player)
-            opp_moves = game.get_opponent_moves(my_player=my_player)
-
-        else:
-            my_moves = game.get_opponent_moves(my_player=my_player)
-            opp_moves = game.get_player_moves(my_player=my_player)
+        my_moves, opp_moves = game.mobility_pair(my_player)
 
         board_size = game.width * game.height
         ratio = game.move_count / board_size
 
         if ratio <= 0.5:
-            return len(my_moves) - (len(opp_moves) * 2)
+            return my_moves - (opp_moves * 2)
         else:
-            return (len(my_moves) * 2) - len(opp_moves)
+            return (my_moves * 2) - opp_moves
+
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
+
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        boards = BoardBatch.of(boards)
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        ratio = game_ratio_batch(boards)
+        return np.where(ratio <= 0.5, my_moves - (opp_moves * 2), (my_moves * 2) - opp_moves)
+
+
+class TerritoryEvalFn:
+    def __init__(self, territory_weight=1, area_weight=0):
+        """
+        Args:
+            territory_weight (int): Weight of a cell of territory, against one legal move
+            area_weight (int): Weight of a reachable cell, against one legal move; 0 leaves the
+                reachable area out
+        """
+        self.territory_weight = territory_weight
+        self.area_weight = area_weight
+
+    def score(self, game, my_player=None):
+        """Score the current game state.
+
+        The territory heuristic counts the open cells each player's queens can reach before the
+        opponent's can (see Board.territory), and favors the player with more of them. Mobility
+        only sees the next move; territory sees how much room each player has left to move in,
+        which is what decides the game once the board starts to partition. The cells each
+        player can reach at all (see Board.reachable_area) can count too, for the room a player
+        has behind cells the opponent gets to first; by default they do not, as they did not
+        make the player stronger. The difference in mobility is added to break ties between
+        positions with the same territory.
+
+        Eval Function == (my_player territory - my_opponent territory) * territory_weight
+                         + (my_player area - my_opponent area) * area_weight
+                         + my_player moves - my_opponent moves
+
+        Args:
+            game (Board): The board and game state.
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            float: The current state's score, based on your own heuristic.
+        """
+        my_cells, opp_cells = game.territory(my_player)
+        my_moves, opp_moves = game.mobility_pair(my_player)
+
+        score = self.territory_weight * (my_cells - opp_cells) + my_moves - opp_moves
+        if self.area_weight:
+            my_area, opp_area = game.reachable_area(my_player)
+            score += self.area_weight * (my_area - opp_area)
+        return score
+
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once, in one vectorized pass (see mobility_batch).
+
+        Args:
+            boards (list[Board] or BoardBatch): Boards of the same size and players, at least one
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            numpy.ndarray: The score() of each board
+        """
+        boards = BoardBatch.of(boards)
+        my_moves, opp_moves = mobility_batch(boards, my_player)
+        territory = boards.territory()
+        my_side = boards.side_of(my_player)
+        my_cells, opp_cells = territory[:, my_side], territory[:, my_side ^ 1]
+        scores = self.territory_weight * (my_cells - opp_cells) + my_moves - opp_moves
+        if self.area_weight:
+            area = boards.reachable_area()
+            scores += self.area_weight * (area[:, my_side] - area[:, my_side ^ 1])
+        return scores
+
+
+class CachedEvalFn:
+    """Wraps any of the evaluation functions above to remember the scores it gives.
+
+    Iterative deepening scores the same leaves at every depth, and transpositions reach them
+    again from sibling subtrees. Scores are remembered by position hash and by which player's
+    score was asked for, and once max_entries are held the least recently used is forgotten.
+    hits and misses count how often a score was remembered and how often it was computed.
+    """
+
+    def __init__(self, eval_fn, max_entries=100000):
+        """
+        Args:
+            eval_fn (object): Evaluation function to remember the scores of
+            max_entries (int): Number of scores to remember
+        """
+        self.eval_fn = eval_fn
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, game, my_player=None):
+        """Score the current game state, as eval_fn does.
+
+        Args:
+            game (Board): The board and game state.
+            my_player (Player object): This specifies which player you are.
+
+        Returns:
+            float: The current state's score.
+        """
+        key = (game.hash_key(), game.__player_1__ is my_player)
+        entries = self.entries
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self.eval_fn.score(game, my_player)
+        entries[key] = value
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return value
+
+    def score_batch(self, boards, my_player=None):
+        """Score many game states at once with eval_fn's score_batch, without the cache."""
+        return self.eval_fn.score_batch(boards, my_player)
+
+    def hit_rate(self):
+        """Fraction of the scores asked for that were remembered"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """Forget every score, and reset the counters"""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
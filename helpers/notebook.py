@@ -21,9 +21,7 @@ def play(Q1, Q2, size=7, time_limit=6000, print_moves=True, seed=None):
     game = Board(Q1, Q2, size, size)
     # assign a random move to each player before playing
     for idx in range(2):
-        moves = game.get_active_moves()
-        random.shuffle(moves)
-        move = moves[0]
+        move = game.random_opening_move()
         game, _, _ = game.forecast_move(move)
     winner, move_history, termination = game.play_isolation(time_limit=time_limit, print_moves=print_moves)
     lock.acquire()
@@ -1,4 +1,3 @@
-from copy import deepcopy
 import time
 import platform
 from io import StringIO
@@ -9,36 +8,150 @@ if platform.system() != "Windows":
 import sys
 import os
 import itertools
-import numpy as np
+import random
 
 sys.path[0] = os.getcwd()
 
+# Per-size lookup tables shared by every Board, keyed by (width, height)
+_geometry_tables = {}
+_edge_tables = {}
+_symmetry_tables = {}
+_zobrist_tables = {}
 
-class Board:
-    BLANK = " "
-    BLOCKED = "X"
-    NOT_MOVED = (-1, -1)
 
-    __player_1__ = None
-    __player_2__ = None
+def board_geometry(width, height):
+    """
+    Lookup tables that only depend on the board size, computed once per size and shared by all boards.
+    Cells are indexed row * width + col.
+    Parameters:
+        width: int, Board width
+        height: int, Board height
+    Returns:
+        (tuple[(int, int)], int, tuple[int]): (row, col) of every cell, bitmask of all cells and,
+        for every cell, the bitmask of the cells one step up, left, right or down from it
+    """
+    key = (width, height)
+    if key not in _geometry_tables:
+        cell_coords = tuple((r, c) for r in range(height) for c in range(width))
+        neighbors = tuple(
+            sum(
+                1 << (row * width + col)
+                for row, col in ((r - 1, c), (r, c - 1), (r, c + 1), (r + 1, c))
+                if 0 <= row < height and 0 <= col < width
+            )
+            for r, c in cell_coords
+        )
+        _geometry_tables[key] = (cell_coords, (1 << (width * height)) - 1, neighbors)
 
-    __active_player__ = None
-    __inactive_player__ = None
+    return _geometry_tables[key]
 
-    __active_player_name__ = ""
-    __inactive_player_name__ = ""
 
-    __active_players_queen1__ = None
-    __active_players_queen2__ = None
-    __active_players_queen3__ = None
-    __inactive_players_queen1__ = None
-    __inactive_players_queen2__ = None
-    __inactive_players_queen3__ = None
+def board_edges(width, height):
+    """
+    Column masks used to shift a cell bitmask one step left or right without wrapping a row
+    into the next, computed once per size.
+    Parameters:
+        width: int, Board width
+        height: int, Board height
+    Returns:
+        (int, int): Bitmask of every cell outside the first column, and outside the last column
+    """
+    key = (width, height)
+    if key not in _edge_tables:
+        first_column = sum(1 << (row * width) for row in range(height))
+        full_mask = (1 << (width * height)) - 1
+        _edge_tables[key] = (full_mask & ~first_column, full_mask & ~(first_column << (width - 1)))
+
+    return _edge_tables[key]
+
+
+def zobrist_keys(width, height):
+    """
+    Random 64-bit Zobrist keys for a board size: one per blocked cell, one per queen per cell and one
+    for player 2 being the side to move. The keys are drawn from a generator seeded with the board size,
+    so every process computes the same hashes for the same position.
+    Parameters:
+        width: int, Board width
+        height: int, Board height
+    Returns:
+        (tuple[int], tuple[tuple[int]], int): Blocked cell keys, queen keys by queen id then cell, side key
+    """
+    key = (width, height)
+    if key not in _zobrist_tables:
+        rng = random.Random(width * 1000 + height)
+        size = width * height
+        blocked_keys = tuple(rng.getrandbits(64) for cell in range(size))
+        queen_keys = tuple(tuple(rng.getrandbits(64) for cell in range(size)) for queen in range(6))
+        _zobrist_tables[key] = (blocked_keys, queen_keys, rng.getrandbits(64))
 
-    __last_queen_move__ = {}
-    __last_queen_symbols__ = {}
-    move_count = 0
-    bf_count = 0
+    return _zobrist_tables[key]
+
+
+def board_symmetries(width, height):
+    """
+    Cell permutations for the reflections and rotations that map a board of the given size onto itself.
+    Computed once per board size. Cells are indexed row * width + col.
+    Parameters:
+        width: int, Board width
+        height: int, Board height
+    Returns:
+        [tuple[int]]: For every symmetry (identity first), the index each cell is sent to
+    """
+    key = (width, height)
+    if key not in _symmetry_tables:
+        transforms = [
+            lambda r, c: (r, c),
+            lambda r, c: (height - 1 - r, c),
+            lambda r, c: (r, width - 1 - c),
+            lambda r, c: (height - 1 - r, width - 1 - c),
+        ]
+        if width == height:
+            transforms += [
+                lambda r, c: (c, r),
+                lambda r, c: (width - 1 - c, r),
+                lambda r, c: (c, height - 1 - r),
+                lambda r, c: (width - 1 - c, height - 1 - r),
+            ]
+
+        _symmetry_tables[key] = [
+            tuple(
+                row * width + col
+                for row, col in (transform(r, c) for r in range(height) for c in range(width))
+            )
+            for transform in transforms
+        ]
+
+    return _symmetry_tables[key]
+
+
+class Board:
+    BLANK = " "
+    BLOCKED = "X"
+    NOT_MOVED = (-1, -1)
+
+    # Queens are identified by small ints: 0-2 are player 1's queens, 3-5 player 2's.
+    # The symbols are only used to display a board and to read one in with set_state.
+    QUEEN_SYMBOLS = ("11", "12", "13", "21", "22", "23")
+
+    __slots__ = (
+        "width",
+        "height",
+        "move_count",
+        "bf_count",
+        "__player_1__",
+        "__player_2__",
+        "__cell_coords__",
+        "__full_mask__",
+        "__neighbors__",
+        "__blocked_mask__",
+        "__queen_mask__",
+        "__positions__",
+        "__side__",
+        "__hash_key__",
+        "__reach__",
+        "__mobility__",
+        "__undo_stack__",
+    )
 
     def __init__(self, player_1, player_2, width=7, height=7):
         self.width = width
@@ -47,50 +160,142 @@ class Board:
         self.__player_1__ = player_1
         self.__player_2__ = player_2
 
-        self.__queen_1_1__ = player_1.__class__.__name__ + " - P1_Q1"
-        self.__queen_1_2__ = player_1.__class__.__name__ + " - P1_Q2"
-        self.__queen_1_3__ = player_1.__class__.__name__ + " - P1_Q3"
+        # Cells are stored as bits of two integer masks, indexed row * width + col
+        self.__cell_coords__, self.__full_mask__, self.__neighbors__ = board_geometry(width, height)
 
-        self.__queen_2_1__ = player_2.__class__.__name__ + " - P2_Q1"
-        self.__queen_2_2__ = player_2.__class__.__name__ + " - P2_Q2"
-        self.__queen_2_3__ = player_2.__class__.__name__ + " - P2_Q3"
+        self.__blocked_mask__ = 0
+        self.__queen_mask__ = 0
 
-        self.__board_state__ = [[Board.BLANK for i in range(0, width)] for j in range(0, height)]
+        # Cell index of every queen by queen id, -1 while the queen has not been placed
+        self.__positions__ = [-1] * 6
 
-        self.__last_queen_move__ = {
-            self.__queen_1_1__: Board.NOT_MOVED,
-            self.__queen_2_1__: Board.NOT_MOVED,
-            self.__queen_1_2__: Board.NOT_MOVED,
-            self.__queen_2_2__: Board.NOT_MOVED,
-            self.__queen_1_3__: Board.NOT_MOVED,
-            self.__queen_2_3__: Board.NOT_MOVED,
-        }
+        # 0 while player 1 is active, 1 while player 2 is active
+        self.__side__ = 0
 
-        self.__queen_symbols__ = {
-            Board.BLANK: Board.BLANK,
-            self.__queen_1_1__: "11",
-            self.__queen_2_1__: "21",
-            self.__queen_1_2__: "12",
-            self.__queen_2_2__: "22",
-            self.__queen_1_3__: "13",
-            self.__queen_2_3__: "23",
-        }
+        # Zobrist hash of the position, kept up to date as moves are applied
+        self.__hash_key__ = 0
 
-        self.__active_player__ = player_1
-        self.__inactive_player__ = player_2
+        self.move_count = 0
+        self.bf_count = 0
 
-        self.__active_player_name__ = f"{player_1.__class__.__name__} - Q1"
-        self.__inactive_player_name__ = f"{player_2.__class__.__name__} - Q2"
+        # Bitmask of each queen's legal destinations by queen id, and number of legal moves of
+        # player 1 and player 2, None until counted; both kept up to date as moves are applied
+        self.__reset_mobility__()
 
-        self.__active_players_queen1__ = self.__queen_1_1__
-        self.__active_players_queen2__ = self.__queen_1_2__
-        self.__active_players_queen3__ = self.__queen_1_3__
-        self.__inactive_players_queen1__ = self.__queen_2_1__
-        self.__inactive_players_queen2__ = self.__queen_2_2__
-        self.__inactive_players_queen3__ = self.__queen_2_3__
+        self.__undo_stack__ = []
 
-        self.move_count = 0
-        self.bf_count = 0
+    @property
+    def __active_player__(self):
+        return self.__player_2__ if self.__side__ else self.__player_1__
+
+    @property
+    def __inactive_player__(self):
+        return self.__player_1__ if self.__side__ else self.__player_2__
+
+    @property
+    def __active_player_name__(self):
+        return self.__player_name__(self.__side__)
+
+    @property
+    def __inactive_player_name__(self):
+        return self.__player_name__(self.__side__ ^ 1)
+
+    def __player_name__(self, side):
+        """
+        Display name of a player.
+        Parameters:
+            side: int, 0 for player 1, 1 for player 2
+        Returns:
+            str: Name of the player, e.g. "CustomPlayer - Q1"
+        """
+        player = self.__player_2__ if side else self.__player_1__
+        return f"{player.__class__.__name__} - Q{side + 1}"
+
+    def __queen_name__(self, queen):
+        """
+        Display name of a queen.
+        Parameters:
+            queen: int, Queen id
+        Returns:
+            str: Name of the queen, e.g. "CustomPlayer - P1_Q1"
+        """
+        player = self.__player_2__ if queen >= 3 else self.__player_1__
+        return f"{player.__class__.__name__} - P{queen // 3 + 1}_Q{queen % 3 + 1}"
+
+    @property
+    def __board_state__(self):
+        """
+        Physical board state rendered from the blocked and queen bitmasks.
+        Parameters:
+            None
+        Returns:
+            State of the board: list[list[str]]
+        """
+        board_state = [[Board.BLANK for i in range(0, self.width)] for j in range(0, self.height)]
+        for row, col in self.__cells_of__(self.__blocked_mask__):
+            board_state[row][col] = Board.BLOCKED
+        for queen, cell in enumerate(self.__positions__):
+            if cell >= 0:
+                row, col = self.__cell_coords__[cell]
+                board_state[row][col] = Board.QUEEN_SYMBOLS[queen]
+        return board_state
+
+    @__board_state__.setter
+    def __board_state__(self, board_state):
+        """
+        Load a list-of-lists board state into the bitmasks. Queen symbols mark occupied cells,
+        any other non-blank string is treated as blocked.
+        Parameters:
+            board_state: list[list[str]], Board state to load
+        Returns:
+            None
+        """
+        self.__blocked_mask__ = 0
+        self.__queen_mask__ = 0
+        for row in range(0, self.height):
+            for col in range(0, self.width):
+                bit = 1 << (row * self.width + col)
+                if board_state[row][col] in Board.QUEEN_SYMBOLS:
+                    self.__queen_mask__ |= bit
+                elif board_state[row][col] != Board.BLANK:
+                    self.__blocked_mask__ |= bit
+
+    def __cells_of__(self, mask):
+        """
+        Convert a cell bitmask into board coordinates, in row-major order.
+        Parameters:
+            mask: int, Bitmask of cells
+        Returns:
+           [(int, int)]: List of (row, col) tuples
+        """
+        coords = self.__cell_coords__
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(coords[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def __open_mask__(self):
+        """
+        Bitmask of the cells that are neither blocked nor occupied by a queen.
+        Parameters:
+            None
+        Returns:
+            int: Bitmask of open cells
+        """
+        return self.__full_mask__ & ~(self.__blocked_mask__ | self.__queen_mask__)
+
+    def __position_of__(self, queen):
+        """
+        Position of a queen in (row, column) format.
+        Parameters:
+            queen: int, Queen id
+        Returns:
+            (int, int): (row, col) of the queen, or NOT_MOVED if it has not been placed
+        """
+        cell = self.__positions__[queen]
+        return self.__cell_coords__[cell] if cell >= 0 else Board.NOT_MOVED
 
     def get_state(self):
         """
@@ -100,7 +305,7 @@ class Board:
         Returns:
             State of the board: list[char]
         """
-        return deepcopy(self.__board_state__)
+        return self.__board_state__
 
     def set_state(self, board_state, p1_turn=True):
         """
@@ -116,49 +321,18 @@ class Board:
         """
         self.__board_state__ = board_state
 
-        string_options = ["11", "12", "13", "21", "22", "23"]
-        all_queens = [
-            self.__queen_1_1__,
-            self.__queen_1_2__,
-            self.__queen_1_3__,
-            self.__queen_2_1__,
-            self.__queen_2_2__,
-            self.__queen_2_3__,
-        ]
-
-        for queen, string_opt in zip(all_queens, string_options):
+        for queen, string_opt in enumerate(Board.QUEEN_SYMBOLS):
             last_move = [
                 (column, row.index(string_opt))
                 for column, row in enumerate(board_state)
                 if string_opt in row
             ]
             if last_move != []:
-                self.__last_queen_move__[queen] = last_move[0]
+                self.__positions__[queen] = last_move[0][0] * self.width + last_move[0][1]
 
-        if not p1_turn:
-            # rotate the players
-            self.__active_player__, self.__inactive_player__ = (
-                self.__inactive_player__,
-                self.__active_player__,
-            )
-            self.__active_player_name__, self.__inactive_player_name__ = (
-                self.__inactive_player_name__,
-                self.__active_player_name__,
-            )
-
-            # rotate the queens
-            self.__active_players_queen1__, self.__inactive_players_queen1__ = (
-                self.__inactive_players_queen1__,
-                self.__active_players_queen1__,
-            )
-            self.__active_players_queen2__, self.__inactive_players_queen2__ = (
-                self.__inactive_players_queen2__,
-                self.__active_players_queen2__,
-            )
-            self.__active_players_queen3__, self.__inactive_players_queen3__ = (
-                self.__inactive_players_queen3__,
-                self.__active_players_queen3__,
-            )
+        self.__side__ = 0 if p1_turn else 1
+        self.__hash_key__ = self.__compute_hash__()
+        self.__reset_mobility__()
 
         # Count X's to get move count + 6 for initial moves
         self.move_count = sum(
@@ -180,48 +354,46 @@ class Board:
         Returns:
             result: (bool, str), Game Over flag, winner
         """
-        queens = self.get_active_players_queens()
+        positions = self.__positions__
+        first_queen = 3 * self.__side__
+        blocked_keys, queen_keys, side_key = zobrist_keys(self.width, self.height)
+        landed_mask = 0
 
         # apply the move, one queen at a time
-        for queen_num, queen in enumerate(queens):
+        for queen_num in range(3):
             row, col = move[queen_num]
+            queen = first_queen + queen_num
+            cell = row * self.width + col
+            landed_mask |= 1 << cell
 
-            queen_pos = self.__last_queen_move__[queen]
-            queen_name = self.__queen_symbols__[queen]
-            self.__board_state__[row][col] = queen_name
-
-            if self.move_is_in_board(queen_pos[0], queen_pos[1]):
-                self.__board_state__[queen_pos[0]][queen_pos[1]] = Board.BLOCKED
+            queen_pos = positions[queen]
+            if queen_pos >= 0:
+                old_bit = 1 << queen_pos
+                self.__blocked_mask__ |= old_bit
+                self.__queen_mask__ &= ~old_bit
+                self.__hash_key__ ^= queen_keys[queen][queen_pos] ^ blocked_keys[queen_pos]
 
-            self.__last_queen_move__[queen] = move[queen_num]
-            self.__board_state__[row][col] = self.__queen_symbols__[queen]
+            positions[queen] = cell
+            self.__queen_mask__ |= 1 << cell
+            self.__hash_key__ ^= queen_keys[queen][cell]
 
         # rotate the players
-        self.__active_player__, self.__inactive_player__ = (
-            self.__inactive_player__,
-            self.__active_player__,
-        )
-        self.__active_player_name__, self.__inactive_player_name__ = (
-            self.__inactive_player_name__,
-            self.__active_player_name__,
-        )
-
-        # rotate the queens
-        self.__active_players_queen1__, self.__inactive_players_queen1__ = (
-            self.__inactive_players_queen1__,
-            self.__active_players_queen1__,
-        )
-        self.__active_players_queen2__, self.__inactive_players_queen2__ = (
-            self.__inactive_players_queen2__,
-            self.__active_players_queen2__,
-        )
-        self.__active_players_queen3__, self.__inactive_players_queen3__ = (
-            self.__inactive_players_queen3__,
-            self.__active_players_queen3__,
-        )
+        self.__side__ ^= 1
+        self.__hash_key__ ^= side_key
+
+        # Only the cells landed on leave the open cells, as the cells left were not open either:
+        # the queens that moved get new destinations, the others just lose those cells
+        open_mask = self.__open_mask__()
+        neighbors = self.__neighbors__
+        kept_mask = ~landed_mask
+        reach = [mask & kept_mask for mask in self.__reach__]
+        for queen in range(first_queen, first_queen + 3):
+            reach[queen] = neighbors[positions[queen]] & open_mask
+        self.__reach__ = reach
+        self.__mobility__ = [None, None]
 
         # If opponent is isolated
-        if not self.get_active_moves():
+        if not self.count_active_moves():
             return True, self.__inactive_player_name__
 
         # increment move count
@@ -229,6 +401,57 @@ class Board:
 
         return False, None
 
+    def push_move(self, move):
+        """
+        Apply a move to this board in place, remembering what is needed to take it back with pop_move.
+        Unlike forecast_move no board is copied, which makes it the cheaper choice inside a search.
+        Parameters:
+            move: ((int, int),(int, int),(int, int)), Desired move for all 3 queens
+        Returns:
+            result: (bool, str), Game Over flag, winner
+        """
+        first_queen = 3 * self.__side__
+        self.__undo_stack__.append(
+            (
+                self.__blocked_mask__,
+                self.__queen_mask__,
+                self.__positions__[first_queen : first_queen + 3],
+                self.move_count,
+                self.__hash_key__,
+                self.__reach__,
+                self.__mobility__,
+            )
+        )
+        return self.__apply_move__(move)
+
+    def pop_move(self):
+        """
+        Undo the last move applied with push_move, restoring blocked cells, queen positions,
+        the active player, the move count and the queens' mobility.
+        Parameters:
+            None
+        Returns:
+            None
+        """
+        (
+            blocked_mask,
+            queen_mask,
+            positions,
+            move_count,
+            hash_key,
+            self.__reach__,
+            self.__mobility__,
+        ) = self.__undo_stack__.pop()
+        self.__side__ ^= 1
+
+        first_queen = 3 * self.__side__
+        self.__positions__[first_queen : first_queen + 3] = positions
+
+        self.__blocked_mask__ = blocked_mask
+        self.__queen_mask__ = queen_mask
+        self.move_count = move_count
+        self.__hash_key__ = hash_key
+
     def copy(self):
         """
         Create a copy of this board and game state.
@@ -237,26 +460,91 @@ class Board:
         Returns:
             Copy of self: Board class
         """
-        b = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
-        for key, value in self.__last_queen_move__.items():
-            b.__last_queen_move__[key] = value
-        for key, value in self.__queen_symbols__.items():
-            b.__queen_symbols__[key] = value
-
+        b = Board.__new__(Board)
+        b.width = self.width
+        b.height = self.height
+        b.__player_1__ = self.__player_1__
+        b.__player_2__ = self.__player_2__
+        b.__cell_coords__ = self.__cell_coords__
+        b.__full_mask__ = self.__full_mask__
+        b.__neighbors__ = self.__neighbors__
+        b.__blocked_mask__ = self.__blocked_mask__
+        b.__queen_mask__ = self.__queen_mask__
+        b.__positions__ = self.__positions__[:]
+        b.__side__ = self.__side__
+        b.__hash_key__ = self.__hash_key__
+        b.__reach__ = self.__reach__[:]
+        b.__mobility__ = self.__mobility__[:]
         b.move_count = self.move_count
-        b.__active_player__ = self.__active_player__
-        b.__active_player_name__ = self.__active_player_name__
-        b.__inactive_player__ = self.__inactive_player__
-        b.__inactive_player_name__ = self.__inactive_player_name__
-        b.__active_players_queen1__ = self.__active_players_queen1__
-        b.__active_players_queen2__ = self.__active_players_queen2__
-        b.__active_players_queen3__ = self.__active_players_queen3__
-        b.__inactive_players_queen1__ = self.__inactive_players_queen1__
-        b.__inactive_players_queen2__ = self.__inactive_players_queen2__
-        b.__inactive_players_queen3__ = self.__inactive_players_queen3__
-        b.__board_state__ = self.get_state()
+        b.bf_count = self.bf_count
+        b.__undo_stack__ = []
         return b
 
+    def __reset_mobility__(self):
+        """
+        Find every queen's legal destinations from scratch, and forget the players' move counts.
+        Moves keep both up to date incrementally, so this is only needed after the board is
+        loaded in another way.
+        Parameters:
+            None
+        Returns:
+            None
+        """
+        open_mask = self.__open_mask__()
+        neighbors = self.__neighbors__
+        self.__reach__ = [
+            neighbors[cell] & open_mask if cell >= 0 else open_mask for cell in self.__positions__
+        ]
+        self.__mobility__ = [None, None]
+
+    def __compute_hash__(self):
+        """
+        Zobrist hash of the position computed from scratch. Moves keep the hash up to date
+        incrementally, so this is only needed after the board is loaded in another way.
+        Parameters:
+            None
+        Returns:
+            int: 64-bit hash of the blocked cells, queen positions and side to move
+        """
+        blocked_keys, queen_keys, side_key = zobrist_keys(self.width, self.height)
+
+        hash_key = side_key if self.__side__ else 0
+        mask = self.__blocked_mask__
+        while mask:
+            low = mask & -mask
+            hash_key ^= blocked_keys[low.bit_length() - 1]
+            mask ^= low
+        for queen, cell in enumerate(self.__positions__):
+            if cell >= 0:
+                hash_key ^= queen_keys[queen][cell]
+        return hash_key
+
+    def hash_key(self):
+        """
+        Zobrist hash of the current position, covering blocked cells, each queen's position and the side
+        to move. Two boards in the same position have the same key, whichever players they belong to.
+        Parameters:
+            None
+        Returns:
+            int: 64-bit hash of the position
+        """
+        return self.__hash_key__
+
+    def __hash__(self):
+        return self.__hash_key__
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return (
+            self.__hash_key__ == other.__hash_key__
+            and self.width == other.width
+            and self.height == other.height
+            and self.__side__ == other.__side__
+            and self.__blocked_mask__ == other.__blocked_mask__
+            and self.__positions__ == other.__positions__
+        )
+
     def forecast_move(self, move):
         """
         See what board state would result from making a particular move without changing the board state itself.
@@ -299,11 +587,8 @@ class Board:
         Returns:
             list[str] : List of Queen names of the player who's taking the current turn
         """
-        return [
-            self.__active_players_queen1__,
-            self.__active_players_queen2__,
-            self.__active_players_queen3__,
-        ]
+        first_queen = 3 * self.__side__
+        return [self.__queen_name__(queen) for queen in range(first_queen, first_queen + 3)]
 
     def get_inactive_players_queens(self):
         """
@@ -313,11 +598,8 @@ class Board:
         Returns:
             list[str] : List of Queen names of the player who's waiting for opponent to take a turn
         """
-        return [
-            self.__inactive_players_queen1__,
-            self.__inactive_players_queen2__,
-            self.__inactive_players_queen3__,
-        ]
+        first_queen = 3 * (self.__side__ ^ 1)
+        return [self.__queen_name__(queen) for queen in range(first_queen, first_queen + 3)]
 
     def get_inactive_position(self):
         """
@@ -327,11 +609,8 @@ class Board:
         Returns:
            [(int, int),(int, int),(int, int)]: List of (row,col) of inactive players queens
         """
-        return [
-            self.__last_queen_move__[self.__inactive_players_queen1__],
-            self.__last_queen_move__[self.__inactive_players_queen2__],
-            self.__last_queen_move__[self.__inactive_players_queen3__],
-        ]
+        first_queen = 3 * (self.__side__ ^ 1)
+        return [self.__position_of__(queen) for queen in range(first_queen, first_queen + 3)]
 
     def get_active_position(self):
         """
@@ -341,11 +620,8 @@ class Board:
         Returns:
            [(int, int),(int, int),(int, int)]: List of (row,col) of active players queens
         """
-        return [
-            self.__last_queen_move__[self.__active_players_queen1__],
-            self.__last_queen_move__[self.__active_players_queen2__],
-            self.__last_queen_move__[self.__active_players_queen3__],
-        ]
+        first_queen = 3 * self.__side__
+        return [self.__position_of__(queen) for queen in range(first_queen, first_queen + 3)]
 
     def get_player_position(self, my_player=None):
         """
@@ -382,28 +658,63 @@ class Board:
             raise ValueError("No value for my_player!")
 
     def get_moves_from_dictionary(self, move_dict, queens):
-
-        queen1_moves = np.empty(len(move_dict[queens[0]]), dtype=object)
-        queen1_moves[:] = move_dict[queens[0]]
-
-        queen2_moves = np.empty(len(move_dict[queens[1]]), dtype=object)
-        queen2_moves[:] = move_dict[queens[1]]
-
-        queen3_moves = np.empty(len(move_dict[queens[2]]), dtype=object)
-        queen3_moves[:] = move_dict[queens[2]]
-
-        moves = np.array(np.meshgrid(queen1_moves, queen2_moves, queen3_moves)).T.reshape(-1, 3)
-        valid_moves = moves[
-            np.logical_not(
-                np.logical_or(
-                    moves[:, 0] == moves[:, 1],
-                    np.logical_or(moves[:, 0] == moves[:, 2], moves[:, 1] == moves[:, 2]),
-                )
+        """
+        Combine the moves of each queen into the list of joint moves where no two queens
+        share a destination.
+        Parameters:
+            move_dict: dict, Legal (row, col) moves of each queen, keyed by queen name
+            queens: [str], Names of the three queens, in move order
+        Returns:
+           [((int, int),(int, int), (int,int))]: List of all legal joint moves
+        """
+        return list(
+            self.__iter_joint_moves__(
+                move_dict[queens[0]], move_dict[queens[1]], move_dict[queens[2]]
             )
-        ]
-        valid_moves = list(map(tuple, valid_moves))
+        )
+
+    def __iter_joint_moves__(self, queen1_moves, queen2_moves, queen3_moves):
+        """
+        Lazily yield every joint move where no two queens share a destination. Queen 3's move
+        varies slowest and queen 2's fastest, the same order get_active_moves has always used.
+        Parameters:
+            queen1_moves, queen2_moves, queen3_moves: [(int, int)], Legal moves of each queen
+        Returns:
+           generator of ((int, int),(int, int), (int,int)): Legal joint moves
+        """
+        for move3 in queen3_moves:
+            for move1 in queen1_moves:
+                if move1 == move3:
+                    continue
+                for move2 in queen2_moves:
+                    if move2 != move1 and move2 != move3:
+                        yield move1, move2, move3
+
+    def iter_inactive_moves(self):
+        """
+        Generator version of get_inactive_moves. Joint moves are produced one at a time, so a
+        caller that stops early never builds the rest.
+        Parameters:
+            None
+        Returns:
+           generator of ((int, int),(int, int), (int,int)): Legal moves of the inactive player
+        """
+        return self.__iter_joint_moves__(
+            *[self.__cells_of__(mask) for mask in self.__reach_masks__(self.__side__ ^ 1)]
+        )
 
-        return valid_moves
+    def iter_active_moves(self):
+        """
+        Generator version of get_active_moves. Joint moves are produced one at a time, so a
+        caller that stops early never builds the rest.
+        Parameters:
+            None
+        Returns:
+           generator of ((int, int),(int, int), (int,int)): Legal moves of the active player
+        """
+        return self.__iter_joint_moves__(
+            *[self.__cells_of__(mask) for mask in self.__reach_masks__(self.__side__)]
+        )
 
     def get_inactive_moves(self):
         """
@@ -415,15 +726,7 @@ class Board:
             ((row, column), (row, column), (row, column)). Each tuple within the 3-tuple refers to the
             move by 1st, 2nd, and 3rd queen respectively.
         """
-        inactive_queens = self.get_inactive_players_queens()
-        move_dict = {
-            inactive_queens[0]: self.__get_moves__(self.__last_queen_move__[inactive_queens[0]]),
-            inactive_queens[1]: self.__get_moves__(self.__last_queen_move__[inactive_queens[1]]),
-            inactive_queens[2]: self.__get_moves__(self.__last_queen_move__[inactive_queens[2]]),
-        }
-
-        all_moves = self.get_moves_from_dictionary(move_dict, inactive_queens)
-        return all_moves
+        return list(self.iter_inactive_moves())
 
     def get_active_moves(self):
         """
@@ -435,15 +738,70 @@ class Board:
             ((row, column), (row, column), (row, column)). Each tuple within the 3-tuple refers to the
             move by 1st, 2nd, and 3rd queen respectively.
         """
-        active_queens = self.get_active_players_queens()
-        move_dict = {
-            active_queens[0]: self.__get_moves__(self.__last_queen_move__[active_queens[0]]),
-            active_queens[1]: self.__get_moves__(self.__last_queen_move__[active_queens[1]]),
-            active_queens[2]: self.__get_moves__(self.__last_queen_move__[active_queens[2]]),
-        }
+        return list(self.iter_active_moves())
+
+    def __count_joint_moves__(self, queen1_mask, queen2_mask, queen3_mask):
+        """
+        Count the joint moves where no two queens share a destination, without building them.
+        Every combination of destinations is counted, then the ones where two queens collide are
+        removed and the ones where all three collide (removed three times) are added back twice.
+        Parameters:
+            queen1_mask, queen2_mask, queen3_mask: int, Bitmask of each queen's legal destinations
+        Returns:
+           int: Number of legal joint moves
+        """
+        n1 = bin(queen1_mask).count("1")
+        n2 = bin(queen2_mask).count("1")
+        n3 = bin(queen3_mask).count("1")
+        shared_12 = queen1_mask & queen2_mask
+        shared_13 = queen1_mask & queen3_mask
+        shared_23 = queen2_mask & queen3_mask
 
-        all_moves = self.get_moves_from_dictionary(move_dict, active_queens)
-        return all_moves
+        return (
+            n1 * n2 * n3
+            - bin(shared_12).count("1") * n3
+            - bin(shared_13).count("1") * n2
+            - bin(shared_23).count("1") * n1
+            + 2 * bin(shared_12 & queen3_mask).count("1")
+        )
+
+    def count_inactive_moves(self):
+        """
+        Number of legal moves of the inactive player, equal to len(get_inactive_moves()) but
+        computed from the queens' destination sets without enumerating the moves.
+        Parameters:
+            None
+        Returns:
+           int: Number of legal moves of the inactive player
+        """
+        return self.__count_moves__(self.__side__ ^ 1)
+
+    def count_active_moves(self):
+        """
+        Number of legal moves of the active player, equal to len(get_active_moves()) but
+        computed from the queens' destination sets without enumerating the moves.
+        Parameters:
+            None
+        Returns:
+           int: Number of legal moves of the active player
+        """
+        return self.__count_moves__(self.__side__)
+
+    def __count_moves__(self, side):
+        """
+        Number of legal moves of a player, counted once per position: __apply_move__ counts the
+        active player's to find whether the game is over, so reading it again, e.g. in an
+        evaluation function, costs nothing. Not meant to be directly called, use
+        count_active_moves or count_inactive_moves instead.
+        Parameters:
+            side: int, 0 for player 1, 1 for player 2
+        Returns:
+           int: Number of legal moves of the player
+        """
+        mobility = self.__mobility__
+        if mobility[side] is None:
+            mobility[side] = self.__count_joint_moves__(*self.__reach_masks__(side))
+        return mobility[side]
 
     def get_player_moves(self, my_player=None):
         """
@@ -484,6 +842,61 @@ class Board:
         else:
             raise ValueError("No value for my_player!")
 
+    def count_player_moves(self, my_player=None):
+        """
+        Get the number of legal moves of certain player object, without enumerating them.
+        Parameters:
+            my_player (Player), Player to count moves for
+            If calling from within a player class, my_player = self can be passed.
+        returns
+            int: Number of legal moves, equal to len(get_player_moves(my_player))
+
+        """
+        if my_player == self.__active_player__:
+            return self.count_active_moves()
+        elif my_player == self.__inactive_player__:
+            return self.count_inactive_moves()
+        else:
+            raise ValueError("No value for my_player!")
+
+    def count_opponent_moves(self, my_player=None):
+        """
+        Get the number of legal moves of the opponent of the player provided, without enumerating them.
+        Parameters:
+            my_player (Player), The player facing the opponent in question
+            If calling from within a player class, my_player = self can be passed.
+        returns
+            int: Number of legal moves, equal to len(get_opponent_moves(my_player))
+
+        """
+        if my_player == self.__active_player__:
+            return self.count_inactive_moves()
+        elif my_player == self.__inactive_player__:
+            return self.count_active_moves()
+        else:
+            raise ValueError("No value for my_player!")
+
+    def mobility_pair(self, my_player=None):
+        """
+        Get the number of legal moves of certain player object and of its opponent at once, as
+        count_player_moves and count_opponent_moves give them. Both are read from the queens'
+        destination sets kept up to date by __apply_move__, counting each player's at most once
+        per position, so evaluation functions can call this at every leaf.
+        Parameters:
+            my_player (Player), Player to count moves for
+            If calling from within a player class, my_player = self can be passed.
+        returns
+            (int, int): Number of legal moves of my_player, and of its opponent
+
+        """
+        if my_player == self.__active_player__:
+            side = self.__side__
+        elif my_player == self.__inactive_player__:
+            side = self.__side__ ^ 1
+        else:
+            raise ValueError("No value for my_player!")
+        return self.__count_moves__(side), self.__count_moves__(side ^ 1)
+
     def __get_moves__(self, move):
         """
         Get all legal moves of a player on current board state as a list of possible moves. Not meant to be directly called,
@@ -498,33 +911,31 @@ class Board:
         if move == self.NOT_MOVED:
             return self.get_first_moves()
 
+        # One step up, left, right or down; ascending bit order matches that direction order
         r, c = move
+        return self.__cells_of__(self.__neighbors__[r * self.width + c] & self.__open_mask__())
 
-        directions = [(-1, 0), (0, -1), (0, 1), (1, 0)]
-
-        moves = []
-        dist = 1
-        for direction in directions:
-            # for dist in range(1, max(self.height, self.width)):
-            row = direction[0] * dist + r
-            col = direction[1] * dist + c
-            if (
-                self.move_is_in_board(row, col)
-                and self.is_spot_open(row, col)
-                and (row, col) not in moves
-            ):
-                moves.append((row, col))
-
-        return moves
+    def __reach_masks__(self, side):
+        """
+        Bitmasks of the cells each queen of a player can move to, as kept up to date by
+        __apply_move__. Not meant to be directly called, use __get_moves__ for the list of moves
+        of a single queen.
+        Parameters:
+            side: int, 0 for player 1's queens, 1 for player 2's queens
+        Returns:
+           [int, int, int]: Bitmask of the legal destinations of the player's 1st, 2nd and 3rd queen
+        """
+        first_queen = 3 * side
+        return self.__reach__[first_queen : first_queen + 3]
 
     def get_legal_moves_of_queen1(self):
-        return self.__get_moves__(self.__last_queen_move__[self.__active_players_queen1__])
+        return self.__cells_of__(self.__reach_masks__(self.__side__)[0])
 
     def get_legal_moves_of_queen2(self):
-        return self.__get_moves__(self.__last_queen_move__[self.__active_players_queen2__])
+        return self.__cells_of__(self.__reach_masks__(self.__side__)[1])
 
     def get_legal_moves_of_queen3(self):
-        return self.__get_moves__(self.__last_queen_move__[self.__active_players_queen3__])
+        return self.__cells_of__(self.__reach_masks__(self.__side__)[2])
 
     def get_first_moves(self):
         """
@@ -534,12 +945,370 @@ class Board:
         Returns:
            [(int, int)]: List of (row,col) tuples of legal moves
         """
-        return [
-            (i, j)
-            for i in range(0, self.height)
-            for j in range(0, self.width)
-            if self.__board_state__[i][j] == Board.BLANK
+        return self.__cells_of__(self.__open_mask__())
+
+    def in_opening(self):
+        """
+        Whether the active player still has to place its queens, i.e. every active queen is at NOT_MOVED.
+        Parameters:
+            None
+        Returns:
+            bool: True if the active player is making its opening placement
+        """
+        first_queen = 3 * self.__side__
+        return all(cell < 0 for cell in self.__positions__[first_queen : first_queen + 3])
+
+    def iter_opening_moves(self):
+        """
+        Opening placements for the active player, reduced for search. The three queens are
+        interchangeable, so each set of three cells is produced once, in ascending cell order, and
+        placements that a reflection or rotation of the current board maps onto an earlier one are
+        skipped. Every legal opening is equivalent to exactly one yielded move.
+        Only meant to be called while in_opening() is True.
+        Parameters:
+            None
+        Returns:
+           generator of ((int, int),(int, int), (int,int)): Opening placements
+        """
+        coords = self.__cell_coords__
+        size = self.width * self.height
+        symmetries = [
+            perm for perm in board_symmetries(self.width, self.height)[1:] if self.__is_symmetric__(perm)
         ]
+        cells = [row * self.width + col for row, col in self.get_first_moves()]
+
+        for i, a in enumerate(cells):
+            for j in range(i + 1, len(cells)):
+                b = cells[j]
+                for c in cells[j + 1 :]:
+                    # skip the placement unless it is the smallest among its symmetric images
+                    key = (a * size + b) * size + c
+                    if any(
+                        self.__triple_key__(perm[a], perm[b], perm[c], size) < key
+                        for perm in symmetries
+                    ):
+                        continue
+                    yield coords[a], coords[b], coords[c]
+
+    def __triple_key__(self, a, b, c, size):
+        """
+        Sort key of an unordered set of three cells, used to pick one placement per symmetry class.
+        Parameters:
+            a, b, c: int, Cell indices
+            size: int, Number of cells on the board
+        Returns:
+            int: Key of the three cells in ascending order
+        """
+        if a > b:
+            a, b = b, a
+        if b > c:
+            b, c = c, b
+        if a > b:
+            a, b = b, a
+        return (a * size + b) * size + c
+
+    def __is_symmetric__(self, perm):
+        """
+        Whether a cell permutation leaves the blocked cells and each player's set of queen cells unchanged.
+        Parameters:
+            perm: tuple[int], Index each cell is sent to, from board_symmetries
+        Returns:
+            bool: True if the position is invariant under the permutation
+        """
+        mapped = 0
+        for row, col in self.__cells_of__(self.__blocked_mask__):
+            mapped |= 1 << perm[row * self.width + col]
+        if mapped != self.__blocked_mask__:
+            return False
+
+        for first_queen in (0, 3):
+            placed = {cell for cell in self.__positions__[first_queen : first_queen + 3] if cell >= 0}
+            if {perm[cell] for cell in placed} != placed:
+                return False
+        return True
+
+    def random_opening_move(self, rng=random):
+        """
+        Draw a uniformly random opening placement for the active player without enumerating the
+        opening moves. Cells are drawn at random and redrawn when taken, which needs only a few draws
+        while most of the board is open. Outside the opening a random legal move is chosen instead.
+        Parameters:
+            rng: random.Random, Source of randomness (defaults to the random module)
+        Returns:
+            ((int, int),(int, int), (int,int)): Random legal move, or None if there is none
+        """
+        if not self.in_opening():
+            moves = self.get_active_moves()
+            return rng.choice(moves) if moves else None
+
+        open_mask = self.__open_mask__()
+        size = self.width * self.height
+        open_count = bin(open_mask).count("1")
+        if open_count < 3:
+            return None
+
+        if 2 * open_count < size:
+            return tuple(rng.sample(self.__cells_of__(open_mask), 3))
+
+        chosen = []
+        while len(chosen) < 3:
+            cell = rng.randrange(size)
+            if open_mask >> cell & 1 and cell not in chosen:
+                chosen.append(cell)
+        return tuple(self.__cell_coords__[cell] for cell in chosen)
+
+    def __dilate__(self, mask):
+        """
+        Grow a cell bitmask by one orthogonal step in every direction.
+        Parameters:
+            mask: int, Bitmask of cells
+        Returns:
+            int: Bitmask of the cells in mask or next to one of them
+        """
+        not_first_column, not_last_column = board_edges(self.width, self.height)
+        return self.__full_mask__ & (
+            mask
+            | (mask << self.width)
+            | (mask >> self.width)
+            | ((mask & not_last_column) << 1)
+            | ((mask & not_first_column) >> 1)
+        )
+
+    def __flood_fill__(self, seed_mask, open_mask):
+        """
+        Cells reachable from the seed cells by steps through open cells.
+        Parameters:
+            seed_mask: int, Bitmask of the cells to start from
+            open_mask: int, Bitmask of the cells that can be stepped on
+        Returns:
+            int: Bitmask of the open cells reachable from the seeds, seeds excluded
+        """
+        region = seed_mask
+        while True:
+            grown = region | (self.__dilate__(region) & open_mask)
+            if grown == region:
+                return region & ~seed_mask
+            region = grown
+
+    def is_partitioned(self):
+        """
+        Whether the players' queens are separated for good: every queen is placed and no open cell
+        can be reached by queens of both players. From then on neither player's moves change what
+        the other can do, and the game is decided by how long each can keep its queens moving
+        (see longest_survival).
+        Parameters:
+            None
+        Returns:
+            bool: True if the queens of the two players can no longer interact
+        """
+        positions = self.__positions__
+        if min(positions) < 0:
+            return False
+
+        open_mask = self.__open_mask__()
+        player_1_mask = (1 << positions[0]) | (1 << positions[1]) | (1 << positions[2])
+        player_2_mask = (1 << positions[3]) | (1 << positions[4]) | (1 << positions[5])
+        return not (
+            self.__flood_fill__(player_1_mask, open_mask)
+            & self.__flood_fill__(player_2_mask, open_mask)
+        )
+
+    def territory(self, my_player=None):
+        """
+        Number of open cells each player's queens would get to first, Voronoi style: every cell
+        goes to the player with a queen the fewest steps away from it, counted by growing both
+        players' queens one step at a time through open cells. The active player moves first, so
+        cells as far from both players go to it. Unlike mobility, this looks beyond the next move,
+        and sees the room each player will have once the board starts to partition.
+        Parameters:
+            my_player (Player), Player to count the territory of
+            If calling from within a player class, my_player = self can be passed.
+        Returns:
+            (int, int): Number of cells in the territory of my_player, and of its opponent
+        """
+        if my_player == self.__active_player__:
+            side = self.__side__
+        elif my_player == self.__inactive_player__:
+            side = self.__side__ ^ 1
+        else:
+            raise ValueError("No value for my_player!")
+
+        fronts = [0, 0]
+        for queen, cell in enumerate(self.__positions__):
+            if cell >= 0:
+                fronts[queen // 3 != self.__side__] |= 1 << cell
+
+        # Alternate growing the active (0) and the inactive (1) player's queens into free cells,
+        # with __dilate__ written out as this runs at every leaf
+        not_first_column, not_last_column = board_edges(self.width, self.height)
+        width = self.width
+        free_mask = self.__open_mask__()
+        regions = [0, 0]
+        while fronts[0] or fronts[1]:
+            for turn in (0, 1):
+                front = fronts[turn]
+                front = free_mask & (
+                    (front << width)
+                    | (front >> width)
+                    | ((front & not_last_column) << 1)
+                    | ((front & not_first_column) >> 1)
+                )
+                free_mask &= ~front
+                fronts[turn] = front
+                regions[turn] |= front
+
+        active_cells = bin(regions[0]).count("1")
+        inactive_cells = bin(regions[1]).count("1")
+        if side == self.__side__:
+            return active_cells, inactive_cells
+        return inactive_cells, active_cells
+
+    def reachable_area(self, my_player=None):
+        """
+        Number of open cells each player's queens can reach at all, however many moves it takes
+        and whether or not the opponent gets there first. Cells both players can reach count for
+        both, so unlike territory it tells how much room each player would have if the other
+        stood still, and it equals territory once the queens are partitioned.
+        Parameters:
+            my_player (Player), Player to count the reachable area of
+            If calling from within a player class, my_player = self can be passed.
+        Returns:
+            (int, int): Number of cells my_player can reach, and its opponent can reach
+        """
+        if my_player == self.__player_1__:
+            side = 0
+        elif my_player == self.__player_2__:
+            side = 1
+        else:
+            raise ValueError("No value for my_player!")
+
+        open_mask = self.__open_mask__()
+        areas = [0, 0]
+        for player_side in (0, 1):
+            seed_mask = 0
+            for cell in self.__positions__[3 * player_side : 3 * player_side + 3]:
+                if cell >= 0:
+                    seed_mask |= 1 << cell
+            if seed_mask:
+                areas[player_side] = bin(self.__flood_fill__(seed_mask, open_mask)).count("1")
+        return areas[side], areas[side ^ 1]
+
+    def longest_survival(self, my_player=None, limit=None, check=None):
+        """
+        Longest run of consecutive moves a player can make if the opponent never gets in the way,
+        as is the case once the board is partitioned. Queens whose reachable cells overlap are
+        searched together, the others alone, and the player lasts as long as its shortest lived
+        group. In a partitioned position the active player wins if and only if it lasts longer than
+        the inactive player.
+        Parameters:
+            my_player (Player), Player to compute the survival of, the active player if None
+            limit: int, Stop at the first run of this many moves, None to find the longest
+            check: function, Called now and then during the search; it can raise to abandon it
+        Returns:
+            (int, ((int, int),(int, int), (int,int))): Number of moves, and the first move of such a
+            run (None if the player cannot move)
+        """
+        side = self.__side__
+        if my_player is not None and my_player != self.__active_player__:
+            side ^= 1
+        cells = self.__positions__[3 * side : 3 * side + 3]
+        open_mask = self.__open_mask__()
+        reach = [self.__flood_fill__(1 << cell, open_mask) for cell in cells]
+
+        # Group the queens that can get in each other's way, merging groups a queen connects
+        groups = []
+        for queen_num in range(3):
+            joined = [group for group in groups if any(reach[queen_num] & reach[q] for q in group)]
+            groups = [group for group in groups if group not in joined]
+            groups.append([queen_num] + [q for group in joined for q in group])
+
+        survival = limit
+        destinations = [None] * 3
+        for group in groups:
+            group_cells = tuple(sorted(cells[queen_num] for queen_num in group))
+            group_mask = 0
+            for queen_num in group:
+                group_mask |= reach[queen_num]
+            length, step = self.__survival__(group_cells, group_mask, survival, {}, check)
+            survival = length if survival is None else min(survival, length)
+            if step is not None:
+                for queen_num in group:
+                    destinations[queen_num] = step[group_cells.index(cells[queen_num])]
+
+        if not survival:
+            return 0, None
+        return survival, tuple(self.__cell_coords__[cell] for cell in destinations)
+
+    def __survival__(self, cells, open_mask, limit, memo, check):
+        """
+        Longest run of moves of a group of queens alone on the board. Not meant to be directly
+        called, use longest_survival.
+        Parameters:
+            cells: (int), Sorted cell indices of the queens
+            open_mask: int, Bitmask of the open cells
+            limit: int, Run length at which to stop looking for longer ones, None for no limit
+            memo: dict, Results already found for (cells, open_mask)
+            check: function, Called every 1024 new positions, None to never call one
+        Returns:
+            (int, (int)): Number of moves, and the destination of each queen in cells on the first
+            move of such a run (None if the queens cannot move)
+        """
+        key = (cells, open_mask)
+        if key in memo:
+            return memo[key]
+        if check is not None and not len(memo) & 1023:
+            check()
+
+        # Every move takes one open cell per queen, out of those the queens can still reach
+        seeds = 0
+        for cell in cells:
+            seeds |= 1 << cell
+        bound = bin(self.__flood_fill__(seeds, open_mask)).count("1") // len(cells)
+        if limit is not None:
+            bound = min(bound, limit)
+
+        neighbors = self.__neighbors__
+        best, best_step = 0, None
+        if bound:
+            moves = itertools.product(
+                *[self.__cells_of_index__(neighbors[cell] & open_mask) for cell in cells]
+            )
+            for step in moves:
+                step_mask = 0
+                for cell in step:
+                    step_mask |= 1 << cell
+                if bin(step_mask).count("1") < len(step):
+                    continue
+
+                length = 1 + self.__survival__(
+                    tuple(sorted(step)),
+                    open_mask & ~step_mask,
+                    None if limit is None else limit - 1,
+                    memo,
+                    check,
+                )[0]
+                if length > best:
+                    best, best_step = length, step
+                    if best >= bound:
+                        break
+
+        memo[key] = (best, best_step)
+        return best, best_step
+
+    def __cells_of_index__(self, mask):
+        """
+        Cell indices of the bits of a cell bitmask, in increasing order.
+        Parameters:
+            mask: int, Bitmask of cells
+        Returns:
+            [int]: Cell indices
+        """
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(low.bit_length() - 1)
+            mask ^= low
+        return cells
 
     def move_is_in_board(self, row, col):
         """
@@ -561,7 +1330,7 @@ class Board:
         Returns:
             bool: Whether the [row,col] position is blank (no X)
         """
-        return self.__board_state__[row][col] == Board.BLANK
+        return not (self.__blocked_mask__ | self.__queen_mask__) >> (row * self.width + col) & 1
 
     def is_spot_queen(self, row, col):
         """
@@ -572,7 +1341,7 @@ class Board:
         Returns:
             bool: Whether the [row,col] position is currently occupied by a player's queen
         """
-        return self.__board_state__[row][col] in self.__queen_symbols__.values()
+        return bool(self.__queen_mask__ >> (row * self.width + col) & 1)
 
     def space_is_open(self, row, col):
         """
@@ -584,11 +1353,7 @@ class Board:
         Returns:
             bool: (Row, Col ranges are valid) AND (space is blank)
         """
-        return (
-            0 <= row < self.height
-            and 0 <= col < self.width
-            and self.__board_state__[row][col] == Board.BLANK
-        )
+        return self.move_is_in_board(row, col) and self.is_spot_open(row, col)
 
     def print_board(self, legal_moves=[]):
         """
@@ -600,13 +1365,9 @@ class Board:
             Str: Visual interpretation of board state & possible moves for active player
         """
 
-        p1_q1_r, p1_q1_c = self.__last_queen_move__[self.__queen_1_1__]
-        p1_q2_r, p1_q2_c = self.__last_queen_move__[self.__queen_1_2__]
-        p1_q3_r, p1_q3_c = self.__last_queen_move__[self.__queen_1_3__]
-
-        p2_q1_r, p2_q1_c = self.__last_queen_move__[self.__queen_2_1__]
-        p2_q2_r, p2_q2_c = self.__last_queen_move__[self.__queen_2_2__]
-        p2_q3_r, p2_q3_c = self.__last_queen_move__[self.__queen_2_3__]
+        queen_symbols = {
+            self.__position_of__(queen): symbol for queen, symbol in enumerate(Board.QUEEN_SYMBOLS)
+        }
 
         b = self.__board_state__
 
@@ -618,18 +1379,8 @@ class Board:
         for i in range(len(b)):
             out += str(i) + " |"
             for j in range(len(b[i])):
-                if (i, j) == (p1_q1_r, p1_q1_c):
-                    out += self.__queen_symbols__[self.__queen_1_1__]
-                elif (i, j) == (p1_q2_r, p1_q2_c):
-                    out += self.__queen_symbols__[self.__queen_1_2__]
-                elif (i, j) == (p1_q3_r, p1_q3_c):
-                    out += self.__queen_symbols__[self.__queen_1_3__]
-                elif (i, j) == (p2_q1_r, p2_q1_c):
-                    out += self.__queen_symbols__[self.__queen_2_1__]
-                elif (i, j) == (p2_q2_r, p2_q2_c):
-                    out += self.__queen_symbols__[self.__queen_2_2__]
-                elif (i, j) == (p2_q3_r, p2_q3_c):
-                    out += self.__queen_symbols__[self.__queen_2_3__]
+                if (i, j) in queen_symbols:
+                    out += queen_symbols[(i, j)]
                 elif (i, j) in legal_moves or (i, j) in legal_moves:
                     out += "o "
                 elif b[i][j] == Board.BLANK:
@@ -731,32 +1482,30 @@ class Board:
         Returns:
             None
         """
-        queens = self.get_active_players_queens()
+        positions = self.__positions__
+        first_queen = 3 * self.__side__
 
         # apply the move, one queen at a time
-        for queen_num, queen in enumerate(queens):
+        for queen_num in range(3):
             row, col = move[queen_num]
 
             if move[queen_num][0] is None or move[queen_num][1] is None:
                 return
 
-            self.__last_queen_move__[queen] = move[queen_num]
-            self.__board_state__[row][col] = self.__queen_symbols__[queen]
+            # the vacated cell keeps showing as taken, as it did when the symbol stayed on the board
+            queen_pos = positions[first_queen + queen_num]
+            if queen_pos >= 0:
+                old_bit = 1 << queen_pos
+                self.__blocked_mask__ |= old_bit
+                self.__queen_mask__ &= ~old_bit
 
-        # rotate the players
-        self.__active_player__, self.__inactive_player__ = (
-            self.__inactive_player__,
-            self.__active_player__,
-        )
-        self.__active_player_name__, self.__inactive_player_name__ = (
-            self.__inactive_player_name__,
-            self.__active_player_name__,
-        )
+            positions[first_queen + queen_num] = row * self.width + col
+            self.__queen_mask__ |= 1 << (row * self.width + col)
 
-        # rotate the queens
-        self.__active_players_queen1__ = self.__inactive_players_queen1__
-        self.__active_players_queen2__ = self.__inactive_players_queen2__
-        self.__active_players_queen3__ = self.__inactive_players_queen3__
+        # rotate the players
+        self.__side__ ^= 1
+        self.__hash_key__ = self.__compute_hash__()
+        self.__reset_mobility__()
 
         self.move_count = self.move_count + 1
 
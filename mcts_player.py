@@ -0,0 +1,276 @@
+import math
+import random
+
+import numpy as np
+
+from playouts import random_playouts
+
+
+def random_playout_move(game, rng):
+    """Playout policy: a uniformly random legal move of the active player.
+
+    Each queen's step is drawn on its own and redrawn when two queens collide, which avoids
+    building the list of joint moves. The opening placement is drawn with random_opening_move.
+
+    Args:
+        game (Board): A board and game state.
+        rng (random.Random): Source of randomness
+
+    Returns:
+        tuple: ((int,int),(int,int),(int,int)): Random legal move, or None if there is none
+    """
+    if game.in_opening():
+        return game.random_opening_move(rng)
+
+    queen_moves = (
+        game.get_legal_moves_of_queen1(),
+        game.get_legal_moves_of_queen2(),
+        game.get_legal_moves_of_queen3(),
+    )
+    if not all(queen_moves):
+        return None
+
+    for attempt in range(8):
+        move = tuple(rng.choice(moves) for moves in queen_moves)
+        if len(set(move)) == 3:
+            return move
+
+    # Queens hemmed in around the same cells: draw from the few joint moves there are
+    moves = game.get_active_moves()
+    return rng.choice(moves) if moves else None
+
+
+def mobility_playout_move(game, rng, samples=4):
+    """Playout policy: the best of a few random moves by mobility.
+
+    Draws a few moves with random_playout_move and plays the one that leaves the active player the
+    most moves and the opponent the fewest. Playouts are slower than random ones but closer to real
+    play, which usually makes each of them more informative.
+
+    Args:
+        game (Board): A board and game state.
+        rng (random.Random): Source of randomness
+        samples (int): Number of random moves to choose from
+
+    Returns:
+        tuple: ((int,int),(int,int),(int,int)): Legal move, or None if there is none
+    """
+    best_move, best_score = None, float("-inf")
+    for sample in range(samples):
+        move = random_playout_move(game, rng)
+        if move is None:
+            return None
+
+        is_over, winner = game.push_move(move)
+        score = float("inf") if is_over else game.count_inactive_moves() - game.count_active_moves()
+        game.pop_move()
+
+        if score > best_score:
+            best_move, best_score = move, score
+    return best_move
+
+
+class MCTSNode:
+    """Node of the search tree: the position reached by a move, and the playouts run through it."""
+
+    __slots__ = ("move", "player", "key", "children", "untried_moves", "visits", "wins")
+
+    def __init__(self, move, player, key):
+        """
+        Args:
+            move (tuple): Move leading to the node, None at the root
+            player (object): Player who made the move, None at the root
+            key (int): Board.hash_key() of the position reached
+        """
+        self.move = move
+        self.player = player
+        self.key = key
+        self.children = []
+        # Moves not expanded into children yet, filled in the first time the node is reached
+        self.untried_moves = None
+        self.visits = 0
+        self.wins = 0
+
+    def uct_child(self, exploration):
+        """Child maximizing the UCT score: its win rate for the player making its move, plus an
+        exploration bonus that grows for children visited rarely compared to this node."""
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class MCTSPlayer:
+    """Player that chooses a move with Monte Carlo tree search.
+
+    Each iteration walks down the tree by UCT, adds one new position, plays the game out from it
+    with the playout policy and counts the result in every node on the way. The move finally played
+    is the one whose position was visited most. It is an anytime search: it runs until time_left
+    is nearly spent, and gets a useful answer from any number of iterations, even on boards where
+    an alpha-beta search would only reach a few plies. The subtree of the position reached after
+    the opponent's reply is kept for the next move.
+    """
+
+    def __init__(
+        self,
+        exploration=math.sqrt(2),
+        playout_policy=random_playout_move,
+        time_margin=50,
+        reuse_tree=True,
+        playouts_per_leaf=1,
+        seed=None,
+        output=None,
+        name="MCTSPlayer",
+    ):
+        """Initializes the player.
+
+        Args:
+            exploration (float): Weight of the exploration term of UCT
+            playout_policy (function): Chooses the moves of playouts, called with (game, rng);
+                random_playout_move or mobility_playout_move
+            time_margin (float): Milliseconds of time_left at which the search stops
+            reuse_tree (bool): Keep the subtree of the position reached from one move to the next
+            playouts_per_leaf (int): Playouts run from each new node. Above 1 they are played
+                all at once with random moves by playouts.random_playouts, instead of one by one
+                with playout_policy
+            seed (int): Seed of the random number generator, None for an unpredictable one
+            output (Output): Notebook output widget for progress messages, if any
+            name (str): Name of the player
+        """
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        self.time_margin = time_margin
+        self.reuse_tree = reuse_tree
+        self.playouts_per_leaf = playouts_per_leaf
+        self.rng = random.Random(seed)
+        self.batch_rng = np.random.default_rng(seed)
+        self.output = output
+        self.name = name
+        self.count = 0
+        self.root = None
+
+    def get_name(self):
+        return self.name
+
+    def move(self, game, time_left):
+        """Called to determine one move by the player
+
+        Args:
+            game (Board): The board and game state.
+            time_left (function): Used to determine time left before timeout
+
+        Returns:
+            tuple: ((int,int),(int,int),(int,int)): The chosen move
+        """
+        root = self.find_root(game)
+        while time_left() > self.time_margin:
+            self.iterate(root, game.copy())
+            self.count += self.playouts_per_leaf
+
+        if not root.children:
+            # Not even one iteration fit in the time; any legal move will do
+            return self.playout_policy(game, self.rng)
+
+        best = max(root.children, key=lambda child: child.visits)
+        self.report(
+            f"MCTS Player: Moving {best.move}, won {best.wins} of {best.visits} playouts, "
+            f"{self.count} playouts in total \n"
+        )
+
+        self.root = best if self.reuse_tree else None
+        self.count = 0
+        return best.move
+
+    def find_root(self, game):
+        """Node of the given position in the tree kept from the last move, or a new root.
+
+        Args:
+            game (Board): The board and game state.
+
+        Returns:
+            MCTSNode: Root of the search for this move
+        """
+        key = game.hash_key()
+        if self.root is not None:
+            for child in self.root.children:
+                if child.key == key:
+                    return child
+        return MCTSNode(None, None, key)
+
+    def iterate(self, root, game):
+        """Run one iteration of selection, expansion, playout and backpropagation from root.
+
+        Args:
+            root (MCTSNode): Node of the position of game
+            game (Board): A copy of the board and game state, played on in place
+        """
+        node = root
+        path = [root]
+        winner = None
+
+        # Selection: follow UCT down to a node with moves left to expand
+        while True:
+            if node.untried_moves is None:
+                moves = game.iter_opening_moves() if game.in_opening() else game.iter_active_moves()
+                node.untried_moves = list(moves)
+                self.rng.shuffle(node.untried_moves)
+            if node.untried_moves or not node.children:
+                break
+            node = node.uct_child(self.exploration)
+            is_over, _ = game.push_move(node.move)
+            path.append(node)
+            if is_over:
+                winner = node.player
+                break
+
+        # Expansion: add one child for a move not tried yet
+        if winner is None and node.untried_moves:
+            move = node.untried_moves.pop()
+            player = game.get_active_player()
+            is_over, _ = game.push_move(move)
+            child = MCTSNode(move, player, game.hash_key())
+            node.children.append(child)
+            path.append(child)
+            if is_over:
+                winner = player
+
+        # Playout: finish the game with the playout policy, or many times at once in a batch
+        active = game.get_active_player()
+        playouts = self.playouts_per_leaf
+        if winner is not None:
+            active_wins = playouts if winner is active else 0
+        elif playouts > 1:
+            active_wins = int(random_playouts(game, playouts, self.batch_rng)[0].sum())
+        else:
+            active_wins = int(self.playout(game) is active)
+
+        # Backpropagation: count the playouts in every node on the path
+        for node in path:
+            node.visits += playouts
+            node.wins += active_wins if node.player is active else playouts - active_wins
+
+    def playout(self, game):
+        """Play the game to the end with the playout policy.
+
+        Args:
+            game (Board): A board and game state, played on in place
+
+        Returns:
+            object: The winning player
+        """
+        while True:
+            move = self.playout_policy(game, self.rng)
+            if move is None:
+                return game.get_inactive_player()
+            player = game.get_active_player()
+            is_over, _ = game.push_move(move)
+            if is_over:
+                return player
+
+    def report(self, message):
+        """Write a progress message to the notebook output widget, if the player has one."""
+        if self.output is not None:
+            with self.output:
+                self.output.append_stdout(message)
@@ -50,9 +50,7 @@ def beatRandom(yourAgent):
         output_b = game.copy()
         # assign a random move to each player before playing
         for idx in range(2):
-            moves = game.get_active_moves()
-            random.shuffle(moves)
-            move = moves[0]
+            move = game.random_opening_move()
             game, _, _ = game.forecast_move(move)
         winner, move_history, termination = game.play_isolation(time_limit=6000, print_moves=True)
         print("\n", winner, " has won. Reason: ", termination)
@@ -102,8 +100,10 @@ def algorithmTest(yourAgent, algorithm, algorithm_name):
         expected_depth_scores = [(1, -16), (2, -16), (3, -7), (4, 1)]
 
         for depth, exp_score in expected_depth_scores:
+            player.count = 0
             move, score = algorithm(player, sample_board, time_left, depth=depth, my_turn=True)
             print(score)
+            print(f"{algorithm_name} searched {player.count} game states")
             if exp_score != score:
                 print(f"{algorithm_name} failed for depth: ", depth)
                 test_pass = False
@@ -130,8 +130,10 @@ def algorithmTest(yourAgent, algorithm, algorithm_name):
             expected_depth_scores = [(1, 6), (2, 5), (3, 5), (4, 2)]
 
             for depth, exp_score in expected_depth_scores:
+                player.count = 0
                 move, score = algorithm(player, sample_board, time_left, depth=depth, my_turn=True)
                 print(score)
+                print(f"{algorithm_name} searched {player.count} game states")
                 if exp_score != score:
                     print(f"{algorithm_name} failed for depth: ", depth)
                     test_pass = False
@@ -149,3 +151,132 @@ def algorithmTest(yourAgent, algorithm, algorithm_name):
     except:
         print(f'{algorithm_name} Test: ERROR OCCURRED')
         print(traceback.format_exc())
+
+
+def endgameSolverTest(yourAgent, solver):
+    """Example test to make sure the endgame
+        solver gets partitioned positions right.
+        Player 1's queens are each walled into a
+        dead end one cell long, so they can make
+        one move, while player 2 has the right side
+        of the board to itself: whoever is to move,
+        player 2 wins."""
+
+    print("Running the endgame solver test")
+    print()
+    try:
+        def time_left():  # For these testing purposes, let's ignore timeouts
+            return 10000
+
+        board_state = [
+            ["11", " ", "X", " ", "21", " ", " "],
+            ["X", "X", "X", " ", " ", " ", " "],
+            ["12", " ", "X", " ", " ", " ", " "],
+            ["X", "X", "X", " ", "22", " ", " "],
+            ["13", " ", "X", " ", " ", " ", " "],
+            ["X", "X", "X", " ", " ", " ", " "],
+            ["X", "X", "X", " ", "23", " ", " "]
+        ]
+        test_pass = True
+
+        for p1_turn in (True, False):
+            player_1, player_2 = yourAgent(), yourAgent()
+            sample_board = Board(player_1, player_2)
+            sample_board.set_state(board_state, p1_turn=p1_turn)
+            active_player = sample_board.get_active_player()
+
+            if not sample_board.is_partitioned():
+                print("Endgame solver failed: the board is not seen as partitioned")
+                test_pass = False
+
+            survival, move = sample_board.longest_survival(player_1)
+            print(f"Player 1 survives {survival} moves, first move {move}")
+            if survival != 1 or move != ((0, 1), (2, 1), (4, 1)):
+                print("Endgame solver failed: player 1 has exactly one move left")
+                test_pass = False
+
+            move, score = solver(active_player, sample_board, time_left)
+            exp_score = float("-inf") if p1_turn else float("inf")
+            print(score)
+            if score != exp_score or move not in sample_board.get_active_moves():
+                print(f"Endgame solver failed with player {1 if p1_turn else 2} to move")
+                test_pass = False
+            else:
+                print(f"Endgame solver passed with player {1 if p1_turn else 2} to move")
+
+        if test_pass:
+            print("Endgame solver Test: Runs Successfully!")
+
+        else:
+            print("Endgame solver Test: Failed")
+
+    except NotImplementedError:
+        print('Endgame solver Test: Not implemented')
+    except:
+        print('Endgame solver Test: ERROR OCCURRED')
+        print(traceback.format_exc())
+
+
+def transpositionTableTest(yourTable):
+    """Example test to make sure a transposition
+        table gives back what it was given: scores
+        of every kind, a missing best move, and
+        deeper results kept over shallower ones
+        for the same position."""
+
+    print("Running the transposition table test")
+    print()
+    try:
+        table = yourTable(memory_mb=1)
+        rng = random.Random(0)
+        test_pass = True
+
+        # (depth, score, bound, best_move); bounds are EXACT 0, LOWER_BOUND 1 and UPPER_BOUND 2
+        entries = [
+            (1, float("-inf"), 2, None),
+            (4, float("inf"), 1, ((0, 1), (2, 3), (6, 6))),
+            (7, -12, 0, ((3, 3), (0, 0), (6, 5))),
+            (62, 0, 0, ((14, 14), (13, 0), (0, 13))),
+        ]
+        keys = [rng.getrandbits(64) for _ in entries]
+        for key, entry in zip(keys, entries):
+            table.store(key, *entry)
+        for key, entry in zip(keys, entries):
+            result = table.lookup(key)
+            print(result)
+            if result is None or tuple(result[1:]) != entry:
+                print("Transposition table failed to give back ", entry)
+                test_pass = False
+
+        # A shallower result never replaces a deeper one of the same position, a deeper one does
+        key = keys[2]
+        table.store(key, 3, 5, 0, None)
+        if tuple(table.lookup(key)[1:]) != entries[2]:
+            print("Transposition table failed: a shallower result replaced a deeper one")
+            test_pass = False
+        table.store(key, 8, 5, 0, None)
+        if tuple(table.lookup(key)[1:]) != (8, 5, 0, None):
+            print("Transposition table failed: a deeper result did not replace a shallower one")
+            test_pass = False
+
+        # Another position in the same slot takes it over, whatever its depth
+        other_key = key + table.size
+        table.store(other_key, 1, 2, 0, None)
+        if table.lookup(key) is not None or tuple(table.lookup(other_key)[1:]) != (1, 2, 0, None):
+            print("Transposition table failed: the slot was not taken over by another position")
+            test_pass = False
+
+        if hasattr(table, "close"):
+            table.close()
+
+        if test_pass:
+            print("Transposition table Test: Runs Successfully!")
+
+        else:
+            print("Transposition table Test: Failed")
+
+    except NotImplementedError:
+        print('Transposition table Test: Not implemented')
+    except:
+        print('Transposition table Test: ERROR OCCURRED')
+        print(traceback.format_exc())
@@ -0,0 +1,354 @@
+import itertools
+
+import numpy as np
+
+from isolation import board_geometry
+
+# Adjacency arrays shared by every batch, keyed by (width, height)
+_adjacency_tables = {}
+
+
+def board_adjacency(width, height):
+    """Cells one step from each cell as a bool array, computed once per board size.
+
+    Args:
+        width (int): Board width
+        height (int): Board height
+
+    Returns:
+        numpy.ndarray: (cells + 1, cells) bool. Row c marks the cells one step from cell c; the
+            last row, indexed by the -1 of a queen not placed yet, marks every cell, as a
+            placement can go anywhere
+    """
+    key = (width, height)
+    if key not in _adjacency_tables:
+        cell_coords, full_mask, neighbors = board_geometry(width, height)
+        cells = width * height
+        adjacency = np.ones((cells + 1, cells), dtype=bool)
+        for cell in range(cells):
+            adjacency[cell] = [bool(neighbors[cell] >> other & 1) for other in range(cells)]
+        _adjacency_tables[key] = adjacency
+
+    return _adjacency_tables[key]
+
+
+def count_joint_moves(reach):
+    """Number of joint moves of players from their queens' destinations, the same count as
+    Board.count_active_moves: every choice of one destination per queen, all three distinct.
+
+    Args:
+        reach (numpy.ndarray): (..., 3, cells) bool, legal destinations of each queen
+
+    Returns:
+        numpy.ndarray: (...) int, number of legal joint moves
+    """
+    reach_1, reach_2, reach_3 = reach[..., 0, :], reach[..., 1, :], reach[..., 2, :]
+    n1, n2, n3 = reach_1.sum(axis=-1), reach_2.sum(axis=-1), reach_3.sum(axis=-1)
+    shared_12 = reach_1 & reach_2
+    return (
+        n1 * n2 * n3
+        - shared_12.sum(axis=-1) * n3
+        - (reach_1 & reach_3).sum(axis=-1) * n2
+        - (reach_2 & reach_3).sum(axis=-1) * n1
+        + 2 * (shared_12 & reach_3).sum(axis=-1)
+    )
+
+
+class BoardBatch:
+    """Many positions of one game as arrays, for the features of all of them to be computed at
+    once (see evaluation_functions.mobility_batch) rather than one Board at a time.
+
+    Attributes:
+        width (int): Board width
+        height (int): Board height
+        player_1 (object): Player 1 in every position
+        player_2 (object): Player 2 in every position
+        open (numpy.ndarray): (positions, cells) bool, cells neither blocked nor occupied by a queen
+        positions (numpy.ndarray): (positions, 6) int, cell index of each queen, -1 if not placed
+        side (numpy.ndarray): (positions,) int, 0 where player 1 is to move and 1 where player 2 is
+        move_count (numpy.ndarray): (positions,) int, Board.move_count of each position
+    """
+
+    def __init__(self, width, height, player_1, player_2, open_cells, positions, side, move_count):
+        self.width = width
+        self.height = height
+        self.player_1 = player_1
+        self.player_2 = player_2
+        self.open = open_cells
+        self.positions = positions
+        self.side = side
+        self.move_count = move_count
+
+    def __len__(self):
+        return len(self.side)
+
+    def side_of(self, player):
+        """0 if player is player 1 and 1 if it is player 2, as Board.__side__ numbers them"""
+        if player is self.player_1:
+            return 0
+        if player is self.player_2:
+            return 1
+        raise ValueError("No value for my_player!")
+
+    @classmethod
+    def of(cls, boards):
+        """boards itself if it is a BoardBatch already, else the BoardBatch of a list of boards"""
+        return boards if isinstance(boards, cls) else cls.from_boards(boards)
+
+    @classmethod
+    def from_boards(cls, boards):
+        """Pack boards of the same size and players.
+
+        Args:
+            boards (list[Board]): Boards to pack, at least one
+
+        Returns:
+            BoardBatch: The positions of the boards, in order
+        """
+        width, height = boards[0].width, boards[0].height
+        row_bytes = (width * height + 7) // 8
+        packed = b"".join(board.__open_mask__().to_bytes(row_bytes, "little") for board in boards)
+        open_cells = np.unpackbits(
+            np.frombuffer(packed, dtype=np.uint8).reshape(len(boards), row_bytes),
+            axis=1,
+            count=width * height,
+            bitorder="little",
+        ).astype(bool)
+        return cls(
+            width,
+            height,
+            boards[0].__player_1__,
+            boards[0].__player_2__,
+            open_cells,
+            np.array([board.__positions__ for board in boards], dtype=np.int64),
+            np.array([board.__side__ for board in boards], dtype=np.int64),
+            np.array([board.move_count for board in boards], dtype=np.int64),
+        )
+
+    @classmethod
+    def children(cls, game, moves):
+        """Pack the positions reached by moves of the active player, without making them.
+
+        A move only takes the three cells its queens land on out of the open cells: the cells
+        they leave are blocked, but were not open before either.
+
+        Args:
+            game (Board): A board and game state.
+            moves (list): Legal moves of the active player, at least one
+
+        Returns:
+            BoardBatch: The position after each move, in order. A position where the game is over
+                has the move_count of one where it goes on
+        """
+        parent = cls.from_boards([game])
+        width, count = game.width, len(moves)
+        destinations = np.array(
+            [[row * width + col for row, col in move] for move in moves], dtype=np.int64
+        )
+
+        open_cells = np.repeat(parent.open, count, axis=0)
+        open_cells[np.arange(count)[:, None], destinations] = False
+        positions = np.repeat(parent.positions, count, axis=0)
+        first_queen = 3 * game.__side__
+        positions[:, first_queen : first_queen + 3] = destinations
+        return cls(
+            width,
+            game.height,
+            parent.player_1,
+            parent.player_2,
+            open_cells,
+            positions,
+            np.full(count, game.__side__ ^ 1, dtype=np.int64),
+            np.full(count, game.move_count + 1, dtype=np.int64),
+        )
+
+    def joint_moves(self):
+        """Number of legal moves of both players in every position, as Board.count_active_moves
+        and count_inactive_moves count them.
+
+        Returns:
+            numpy.ndarray: (positions, 2) int, moves of player 1 and moves of player 2
+        """
+        adjacency = board_adjacency(self.width, self.height)
+        reach = self.open[:, None, :] & adjacency[self.positions]
+        return count_joint_moves(reach.reshape(len(self), 2, 3, -1))
+
+    def territory(self):
+        """Number of open cells each player would get to first in every position, as
+        Board.territory counts them, growing all the positions' queens a step at a time at once.
+
+        Returns:
+            numpy.ndarray: (positions, 2) int, cells in the territory of player 1 and of player 2
+        """
+        count, cells = self.open.shape
+        steps = board_adjacency(self.width, self.height)[:-1].astype(np.uint8)
+        rows = np.arange(count)
+
+        fronts = np.zeros((count, 2, cells), dtype=bool)
+        for queen in range(6):
+            placed = np.flatnonzero(self.positions[:, queen] >= 0)
+            fronts[placed, queen // 3, self.positions[placed, queen]] = True
+
+        # Alternate growing the active and the inactive player's queens into free cells
+        free = self.open.copy()
+        territory = np.zeros((count, 2), dtype=np.int64)
+        while fronts.any():
+            for turn in (self.side, self.side ^ 1):
+                grown = (fronts[rows, turn].astype(np.uint8) @ steps > 0) & free
+                free &= ~grown
+                fronts[rows, turn] = grown
+                territory[rows, turn] += grown.sum(axis=1)
+        return territory
+
+    def reachable_area(self):
+        """Number of open cells each player's queens can reach in every position, as
+        Board.reachable_area counts them, growing all the positions' queens at once.
+
+        Returns:
+            numpy.ndarray: (positions, 2) int, cells player 1 and player 2 can reach
+        """
+        count, cells = self.open.shape
+        steps = board_adjacency(self.width, self.height)[:-1].astype(np.uint8)
+
+        fronts = np.zeros((count, 2, cells), dtype=bool)
+        for queen in range(6):
+            placed = np.flatnonzero(self.positions[:, queen] >= 0)
+            fronts[placed, queen // 3, self.positions[placed, queen]] = True
+
+        # Unlike territory, a cell reached by one player stays free for the other
+        free = np.repeat(self.open[:, None, :], 2, axis=1)
+        area = np.zeros((count, 2), dtype=np.int64)
+        while fronts.any():
+            fronts = (fronts.astype(np.uint8) @ steps > 0) & free
+            free &= ~fronts
+            area += fronts.sum(axis=2)
+        return area
+
+
+class PlayoutBatch:
+    """Many games of isolation played out at once with random moves, as NumPy arrays.
+
+    Every game is held as a row of open cells and a row of queen cells, and step() makes one
+    random legal move in every unfinished game with a few array operations. This is much faster
+    than playing the games one at a time on Board objects, and is meant for the many random
+    playouts of rollout based players and of opening statistics.
+
+    Attributes:
+        open (numpy.ndarray): (games, cells) bool, cells neither blocked nor occupied by a queen
+        positions (numpy.ndarray): (games, 6) int, cell index of each queen, -1 if not placed
+        side (numpy.ndarray): (games,) int, 0 while player 1 is to move, 1 while player 2 is
+        winner (numpy.ndarray): (games,) int, 0 or 1 for the winning player, -1 while playing
+        plies (numpy.ndarray): (games,) int, number of moves made in each game
+    """
+
+    # Random draws per queen before a game whose queens keep colliding is solved exactly
+    MAX_DRAWS = 8
+
+    def __init__(self, game, games, rng=None):
+        """
+        Args:
+            game (Board): Position every game starts from
+            games (int): Number of games
+            rng (numpy.random.Generator): Source of randomness, None for an unpredictable one
+        """
+        self.adjacency = board_adjacency(game.width, game.height)
+
+        start = BoardBatch.from_boards([game])
+        self.open = np.tile(start.open, (games, 1))
+        self.positions = np.tile(start.positions, (games, 1))
+        self.side = np.tile(start.side, games)
+        self.winner = np.full(games, -1, dtype=np.int64)
+        self.plies = np.zeros(games, dtype=np.int64)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def step(self):
+        """Make one random move in every unfinished game, ending those whose player cannot move.
+
+        Returns:
+            bool: True if any game was still being played
+        """
+        live = np.flatnonzero(self.winner < 0)
+        if not live.size:
+            return False
+
+        side = self.side[live]
+        queens = 3 * side[:, None] + np.arange(3)
+        positions = self.positions[live[:, None], queens]
+        reach = self.open[live][:, None, :] & self.adjacency[positions]
+
+        # A player left without a joint move has lost
+        stuck = count_joint_moves(reach) == 0
+        self.winner[live[stuck]] = side[stuck] ^ 1
+
+        moving = ~stuck
+        games = live[moving]
+        destinations = self.draw_moves(reach[moving])
+        self.positions[games[:, None], queens[moving]] = destinations
+        self.open[games[:, None], destinations] = False
+        self.side[games] ^= 1
+        self.plies[games] += 1
+        return True
+
+    def draw_moves(self, reach):
+        """Draw a uniformly random joint move for each game.
+
+        Each queen's destination is drawn on its own, and games where two queens collide draw
+        again, which is uniform over the joint moves. Games still colliding after MAX_DRAWS tries
+        choose among their joint moves listed one by one.
+
+        Args:
+            reach (numpy.ndarray): (games, 3, cells) bool, legal destinations of each queen
+
+        Returns:
+            numpy.ndarray: (games, 3) int, destination cell of each queen
+        """
+        destinations = np.empty(reach.shape[:2], dtype=np.int64)
+        pending = np.arange(reach.shape[0])
+        for draw in range(self.MAX_DRAWS):
+            scores = self.rng.random((pending.size,) + reach.shape[1:])
+            scores[~reach[pending]] = -1
+            drawn = scores.argmax(axis=2)
+            distinct = (
+                (drawn[:, 0] != drawn[:, 1])
+                & (drawn[:, 0] != drawn[:, 2])
+                & (drawn[:, 1] != drawn[:, 2])
+            )
+            destinations[pending[distinct]] = drawn[distinct]
+            pending = pending[~distinct]
+            if not pending.size:
+                return destinations
+
+        for game in pending:
+            moves = [
+                move
+                for move in itertools.product(*[np.flatnonzero(queen) for queen in reach[game]])
+                if len(set(move)) == 3
+            ]
+            destinations[game] = moves[self.rng.integers(len(moves))]
+        return destinations
+
+    def run(self):
+        """Play every game to the end.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): winner (0 or 1) and number of moves of each game
+        """
+        while self.step():
+            pass
+        return self.winner, self.plies
+
+
+def random_playouts(game, games, rng=None):
+    """Play a position out many times with random moves, and report who won each game.
+
+    Args:
+        game (Board): A board and game state.
+        games (int): Number of playouts
+        rng (numpy.random.Generator): Source of randomness, None for an unpredictable one
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): bool, whether the active player of game won each playout,
+            and int, number of moves made in each playout
+    """
+    winner, plies = PlayoutBatch(game, games, rng).run()
+    return winner == game.__side__, plies